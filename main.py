@@ -1,8 +1,21 @@
 import os
 import sys
+import bisect
+import heapq
+import csv
+import hashlib
+import itertools
+import math
+import pickle
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
 from contextlib import contextmanager
+import numpy as np
 import osmnx as ox
+import shapely.wkt
 import networkx as nx
+from scipy.spatial import cKDTree
 from colorama import Fore, Style, init
 
 import plotly.graph_objects as go
@@ -12,7 +25,69 @@ import community as community_louvain
 
 VEHICLE_SPEED_TYPE_I = 10  # km/h
 VEHICLE_SPEED_TYPE_II = 20  # km/h
+
+# Modèle de coût et capacité de chaque type de véhicule. La capacité est exprimée en km de
+# rue traités avant de devoir revenir au dépôt (sel et carburant).
+VEHICLE_TYPES = {
+    'I': {'speed': VEHICLE_SPEED_TYPE_I, 'fixed_cost': 500, 'km_cost': 1.1,
+          'hour_cost': 1.1, 'overtime_hour_cost': 1.3, 'capacity': 40},
+    'II': {'speed': VEHICLE_SPEED_TYPE_II, 'fixed_cost': 800, 'km_cost': 1.3,
+           'hour_cost': 1.3, 'overtime_hour_cost': 1.5, 'capacity': 60},
+}
+OVERTIME_THRESHOLD = 8  # h, au-delà les heures sont majorées
+
 num_vehicles = 3  # Nombre de véhicules disponibles
+mixed_fleet = None  # Flotte mixte avec retours au dépôt, par exemple {'I': 2, 'II': 1}
+merge_districts = False  # Résoudre les quartiers sur un graphe fusionné, sans rues frontalières en double
+drone_coverage = True  # Vol du drone en ligne droite entre points d'observation plutôt que le long des rues
+priority_schedule = False  # Ordonnancer aussi les trajets par priorité des rues et chutes de neige (PriorityScheduler)
+deterministic = True  # Ordre canonique des noeuds : mêmes trajets à chaque exécution
+
+# Attributs conservés en mode allégé : les solveurs n'ont besoin que des
+# coordonnées des noeuds, de la longueur, du sens unique et de la classe des arêtes.
+SLIM_NODE_ATTRIBUTES = ('x', 'y')
+SLIM_EDGE_ATTRIBUTES = ('length', 'oneway', 'highway')
+# Les rues courbes gardent une forme simplifiée (attribut 'shape', WKT) pour le drone,
+# à moins de SLIM_SHAPE_TOLERANCE mètres de leur géométrie OSM.
+SLIM_SHAPE_TOLERANCE = 1  # m
+SLIM_VERSION = 2  # À incrémenter dès que le contenu des graphes allégés change
+
+# Version des solveurs : à incrémenter dès qu'un changement modifie les résultats,
+# pour invalider les entrées du cache disque.
+CODE_VERSION = 6
+SOLVER_CACHE_DIR = "cache"
+SOLVER_CACHE_MAX_BYTES = 512 * 1024 * 1024  # 512 Mo
+SOLVER_CACHE_MEMORY_ENTRIES = 0  # Entrées gardées en mémoire devant le disque (utile en mode service)
+DISTANCE_CACHE_ENTRIES = 64  # Arbres de plus courts chemins gardés en mémoire par GraphManager
+CONNECTING_PATH_ENTRIES = 100000  # Trajets à vide entre deux noeuds gardés en mémoire par GraphManager
+ODD_NODE_CANDIDATES = 5  # Noeuds impairs les plus proches examinés par noeud lors de l'eulérisation
+
+# Projection locale des coordonnées GPS en mètres (équirectangulaire centrée sur Montréal)
+PROJECTION_LATITUDE = 45.5
+EARTH_RADIUS = 6371000  # m
+NODE_MATCH_TOLERANCE = 1.0  # m, distance sous laquelle deux noeuds de quartiers voisins sont fusionnés
+
+DRONE_SENSOR_RADIUS = 50  # m, rayon d'observation de la caméra du drone
+DRONE_TSP_NEIGHBOURS = 8  # Taille des listes de voisins du 2-opt
+DRONE_TSP_MAX_PASSES = 50  # Mouvements 2-opt au plus, en multiples du nombre de points
+
+SPATIAL_INDEX_EDGE_STEP = 25  # m, espacement des points échantillonnés le long des arêtes
+SPATIAL_INDEX_CANDIDATES = 4  # Échantillons examinés d'abord par point pour la plus proche arête (élargi si besoin)
+
+# Priorité de déneigement selon la classe OSM de la rue (les artères d'abord)
+HIGHWAY_PRIORITIES = {
+    'motorway': 6,
+    'trunk': 5,
+    'primary': 4,
+    'secondary': 3,
+    'tertiary': 2,
+    'residential': 1,
+    'unclassified': 1,
+    'living_street': 0.5,
+    'service': 0.5,
+}
+SCHEDULER_BLOCK_LENGTH = 1000  # m, longueur des blocs de rues ordonnancés ensemble
+SNOWFALL_STREAM = "chutes_de_neige.txt"  # Fichier u;v;intensité lu par PriorityScheduler s'il existe
 
 
 # Initialiser colorama
@@ -35,6 +110,377 @@ def suppress_output():
         sys.stderr = original_stderr
 
 
+def graph_fingerprint(graph):
+    """
+    Calculer une empreinte du contenu du graphe utile aux solveurs.
+
+    Seuls les identifiants, les coordonnées et les attributs SLIM_EDGE_ATTRIBUTES
+    entrent dans l'empreinte : un graphe complet et sa version allégée ont donc la même.
+
+    :param graph: Le graphe à identifier.
+    :return: L'empreinte SHA-256 en hexadécimal.
+    """
+    digest = hashlib.sha256()
+    for node in sorted(graph.nodes()):
+        data = graph.nodes[node]
+        digest.update(repr((node, data.get('x'), data.get('y'))).encode())
+    edges = graph.edges(keys=True, data=True) if graph.is_multigraph(
+    ) else ((u, v, 0, data) for u, v, data in graph.edges(data=True))
+    for u, v, k, data in sorted(edges, key=lambda edge: edge[:3]):
+        digest.update(repr((u, v, k) + tuple(data.get(key)
+                      for key in SLIM_EDGE_ATTRIBUTES)).encode())
+    # Les résultats dépendent de l'ordre d'insertion : un graphe canonique a sa propre entrée de cache
+    if graph.graph.get('canonical'):
+        digest.update(b'canonical')
+    return digest.hexdigest()
+
+
+def canonical_graph(graph):
+    """
+    Reconstruire le graphe avec ses noeuds et ses arêtes triés par identifiant.
+
+    Le noeud de départ du circuit, l'appariement des noeuds de degré impair et les
+    choix internes de nx.eulerize dépendent de l'ordre d'insertion : sur un graphe
+    canonique, ils ne dépendent plus que de son contenu.
+
+    :param graph: Le graphe à ordonner.
+    :return: Une copie ordonnée du graphe, marquée 'canonical' dans ses attributs.
+    """
+    canonical = graph.__class__()
+    canonical.graph.update(graph.graph)
+    canonical.graph['canonical'] = True
+    canonical.add_nodes_from(sorted(graph.nodes(data=True), key=lambda node: node[0]))
+    if graph.is_multigraph():
+        canonical.add_edges_from(sorted(graph.edges(keys=True, data=True),
+                                        key=lambda edge: edge[:3]))
+    else:
+        canonical.add_edges_from(sorted(graph.edges(data=True),
+                                        key=lambda edge: edge[:2]))
+    return canonical
+
+
+def route_hash(drone_path, circuits):
+    """
+    Empreinte stable des trajets d'un quartier, pour comparer deux exécutions.
+
+    :param drone_path: Le trajet du drone.
+    :param circuits: Les arêtes de chaque véhicule.
+    :return: L'empreinte SHA-256 en hexadécimal.
+    """
+    payload = repr(([tuple(point) if isinstance(point, (list, tuple)) else point
+                     for point in drone_path],
+                    [[tuple(edge) for edge in circuit] for circuit in circuits]))
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def projected_coordinates(graph, nodes=None):
+    """
+    Projeter les coordonnées des noeuds en mètres.
+
+    Les graphes osmnx non projetés sont en longitude/latitude : on utilise alors une
+    projection équirectangulaire locale, suffisante à l'échelle de l'île.
+
+    :param graph: Le graphe dont on projette les noeuds.
+    :param nodes: Les noeuds à projeter (tous par défaut).
+    :return: La liste des noeuds et le tableau numpy (n, 2) de leurs coordonnées.
+    """
+    nodes = list(graph.nodes()) if nodes is None else list(nodes)
+    coords = [(graph.nodes[node]['x'], graph.nodes[node]['y'])
+              for node in nodes]
+    return nodes, project_points(coords, graph.graph.get('crs', 'epsg:4326'))
+
+
+def project_points(points, crs='epsg:4326'):
+    """
+    Projeter des points (x, y) en mètres, comme projected_coordinates.
+
+    :param points: Les points (longitude, latitude) ou déjà projetés si le CRS l'est.
+    :param crs: Le système de coordonnées des points.
+    :return: Le tableau numpy (n, 2) des coordonnées en mètres.
+    """
+    coords = np.array(points, dtype=float).reshape(-1, 2)
+    if not ox.projection.is_projected(crs):
+        coords = np.radians(coords) * EARTH_RADIUS
+        coords[:, 0] *= math.cos(math.radians(PROJECTION_LATITUDE))
+    return coords
+
+
+def edge_length(graph, u, v):
+    """
+    Longueur réelle de la rue entre u et v, quel que soit le sens et le type de graphe.
+
+    :return: La plus petite longueur parmi les arêtes parallèles, ou 1 si la rue n'existe pas.
+    """
+    for a, b in ((u, v), (v, u)):
+        if graph.has_edge(a, b):
+            data = graph[a][b]
+            if graph.is_multigraph():
+                return min(d.get('length', 1) for d in data.values())
+            return data.get('length', 1)
+    return 1
+
+
+def nearest_targets(road_graph, source, targets, k):
+    """
+    Les k cibles les plus proches d'un noeud, par distance routière.
+
+    Dijkstra arrêté dès que k cibles sont atteintes : on n'explore que le voisinage du noeud.
+
+    :param road_graph: Le nx.Graph pondéré par 'length'.
+    :param source: Le noeud de départ.
+    :param targets: L'ensemble des noeuds cherchés.
+    :param k: Le nombre de cibles voulues.
+    :return: La liste des couples (distance, cible), du plus proche au plus lointain.
+    """
+    distances = {source: 0}
+    heap = [(0, 0, source)]
+    counter = itertools.count(1)
+    found = []
+    while heap and len(found) < k:
+        distance, _, node = heapq.heappop(heap)
+        if distance > distances[node]:
+            continue
+        if node != source and node in targets:
+            found.append((distance, node))
+        for neighbour, data in road_graph[node].items():
+            candidate = distance + data['length']
+            if candidate < distances.get(neighbour, math.inf):
+                distances[neighbour] = candidate
+                heapq.heappush(heap, (candidate, next(counter), neighbour))
+    return found
+
+
+class SpatialIndex:
+    """
+    Index spatial des noeuds et des arêtes d'un graphe, pour rattacher des points GPS au réseau.
+
+    Les noeuds sont rangés dans un KD-tree en coordonnées projetées. Pour les arêtes, chaque
+    rue est échantillonnée tous les SPATIAL_INDEX_EDGE_STEP mètres au plus ; ses extrémités ne
+    sont pas dupliquées : chaque noeud est un seul échantillon qui représente toutes ses
+    arêtes. Les échantillons les plus proches d'un point donnent des arêtes candidates,
+    départagées par la distance exacte au segment. Tout point d'une arête étant à moins de
+    SPATIAL_INDEX_EDGE_STEP / 2 d'un de ses échantillons, la recherche est élargie tant que
+    le rayon des échantillons examinés n'atteint pas la meilleure distance plus ce demi-pas :
+    le résultat est alors exact. Les requêtes sont vectorisées et traitent des lots de points.
+    """
+
+    def __init__(self, graph):
+        """
+        Construire l'index.
+
+        :param graph: Le graphe du quartier.
+        """
+        self.crs = graph.graph.get('crs', 'epsg:4326')
+        nodes, coords = projected_coordinates(graph)
+        self.nodes = np.array(nodes)
+        self.node_tree = cKDTree(coords)
+
+        index = {node: i for i, node in enumerate(nodes)}
+        edges = graph.edges(keys=True) if graph.is_multigraph(
+        ) else ((u, v, 0) for u, v in graph.edges())
+        edges = list({frozenset((u, v)): (u, v, k)
+                     for u, v, k in edges if u != v}.values())
+        self.edges = np.array(edges).reshape(-1, 3)
+        self.edge_starts = coords[[index[u] for u, _, _ in edges]].reshape(-1, 2)
+        self.edge_ends = coords[[index[v] for _, v, _ in edges]].reshape(-1, 2)
+        self.edge_directions = self.edge_ends - self.edge_starts
+        self.inverse_squared_lengths = 1 / np.maximum(
+            (self.edge_directions ** 2).sum(axis=1), 1e-12)
+
+        # Échantillons intérieurs de chaque arête (extrémités exclues)
+        lengths = np.linalg.norm(self.edge_directions, axis=1)
+        steps = np.maximum(np.ceil(lengths / SPATIAL_INDEX_EDGE_STEP).astype(int), 1)
+        interior_edges = np.repeat(np.arange(len(self.edges)), steps - 1)
+        rank = np.arange(len(interior_edges)) - np.repeat(
+            np.cumsum(steps - 1) - (steps - 1), steps - 1) + 1
+        t = (rank / steps[interior_edges])[:, None]
+        starts = self.edge_starts[interior_edges]
+        interior = starts + t * (self.edge_ends[interior_edges] - starts)
+
+        # Un échantillon par noeud, pour toutes ses arêtes : chaque échantillon porte une ligne
+        # de candidats de largeur fixe (degré maximal), complétée en répétant sa première arête
+        incident = [[] for _ in nodes]
+        for edge, (u, v, _) in enumerate(edges):
+            incident[index[u]].append(edge)
+            incident[index[v]].append(edge)
+        sampled_nodes = [i for i, node_edges in enumerate(incident) if node_edges]
+        width = max((len(incident[i]) for i in sampled_nodes), default=1)
+        node_candidates = np.array([incident[i] + [incident[i][0]] * (width - len(incident[i]))
+                                    for i in sampled_nodes], dtype=int).reshape(-1, width)
+        self.sample_candidates = np.concatenate(
+            (np.repeat(interior_edges[:, None], width, axis=1), node_candidates))
+        samples = np.concatenate((interior, coords[sampled_nodes].reshape(-1, 2)))
+        self.edge_tree = cKDTree(samples) if len(samples) else None
+
+    def nearest_nodes(self, points, return_dist=False):
+        """
+        Trouver le noeud le plus proche de chaque point.
+
+        :param points: Les points (longitude, latitude), dans le CRS du graphe.
+        :param return_dist: Si vrai, renvoyer aussi les distances en mètres.
+        :return: Le tableau des noeuds (et celui des distances).
+        """
+        distances, indices = self.node_tree.query(
+            project_points(points, self.crs), workers=-1)
+        nodes = self.nodes[indices]
+        return (nodes, distances) if return_dist else nodes
+
+    def nearest_edges(self, points, return_dist=False):
+        """
+        Trouver l'arête (u, v, clé) la plus proche de chaque point.
+
+        :param points: Les points (longitude, latitude), dans le CRS du graphe.
+        :param return_dist: Si vrai, renvoyer aussi les distances en mètres au segment.
+        :return: Le tableau (n, 3) des arêtes (et celui des distances).
+        """
+        if self.edge_tree is None:
+            raise ValueError("Le graphe ne contient aucune arête")
+        coords = project_points(points, self.crs)
+        best_edges = np.zeros(len(coords), dtype=int)
+        best_distances = np.full(len(coords), np.inf)
+        pending = np.arange(len(coords))
+        examined = 0
+        k = min(SPATIAL_INDEX_CANDIDATES, self.edge_tree.n)
+        while len(pending):
+            radii, samples = self.edge_tree.query(
+                coords[pending], k=k, workers=-1)
+            radii = radii.reshape(len(pending), k)
+            # Seuls les échantillons pas encore examinés (la requête les trie par distance)
+            candidates = self.sample_candidates[samples.reshape(
+                len(pending), k)[:, examined:]].reshape(len(pending), -1)
+
+            # Distance exacte de chaque point à chacun de ses segments candidats
+            x = coords[pending, 0][:, None] - self.edge_starts[candidates, 0]
+            y = coords[pending, 1][:, None] - self.edge_starts[candidates, 1]
+            dx = self.edge_directions[candidates, 0]
+            dy = self.edge_directions[candidates, 1]
+            t = np.clip((x * dx + y * dy) *
+                        self.inverse_squared_lengths[candidates], 0, 1)
+            distances = np.hypot(x - t * dx, y - t * dy)
+            best = distances.argmin(axis=1)
+            rows = np.arange(len(pending))
+            improved = distances[rows, best] < best_distances[pending]
+            best_edges[pending[improved]] = candidates[rows, best][improved]
+            best_distances[pending[improved]] = distances[rows, best][improved]
+
+            # Une arête sans échantillon examiné est à plus de (rayon - demi-pas) du point
+            exact = radii[:, -1] >= best_distances[pending] + \
+                SPATIAL_INDEX_EDGE_STEP / 2
+            if k == self.edge_tree.n:
+                break
+            pending = pending[~exact]
+            examined, k = k, min(2 * k, self.edge_tree.n)
+        edges = self.edges[best_edges]
+        return (edges, best_distances) if return_dist else edges
+
+
+class SolverCache:
+    """Cache disque adressé par contenu pour les résultats intermédiaires des solveurs."""
+
+    def __init__(self, directory=SOLVER_CACHE_DIR, max_bytes=SOLVER_CACHE_MAX_BYTES,
+                 memory_entries=SOLVER_CACHE_MEMORY_ENTRIES):
+        """
+        Initialiser le cache.
+
+        :param directory: Dossier où sont stockées les entrées.
+        :param max_bytes: Taille maximale du dossier ; au-delà, les entrées les moins récemment utilisées sont supprimées.
+        :param memory_entries: Nombre d'entrées récentes gardées aussi en mémoire (0 pour désactiver).
+        """
+        # Chemin absolu : l'emplacement du cache ne dépend plus du dossier courant
+        self.directory = os.path.abspath(directory)
+        self.max_bytes = max_bytes
+        self.memory_entries = memory_entries
+        self.memory = OrderedDict()
+        self.lock = threading.Lock()
+        if not os.path.exists(self.directory):
+            os.makedirs(self.directory)
+
+    def __getstate__(self):
+        # Le verrou ne se sérialise pas (envoi aux processus de solve_districts_parallel)
+        state = self.__dict__.copy()
+        del state['lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.lock = threading.Lock()
+
+    def key(self, fingerprint, stage, **params):
+        """
+        Construire la clé d'une entrée à partir de l'empreinte du graphe, de l'étape et des paramètres.
+
+        :param fingerprint: Empreinte du graphe (voir graph_fingerprint).
+        :param stage: Nom de l'étape mise en cache ('augmentation', 'circuit', 'drone'...).
+        :return: La clé de l'entrée.
+        """
+        payload = repr((CODE_VERSION, fingerprint, stage,
+                       sorted(params.items())))
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def path(self, key):
+        """Retourner le chemin du fichier associé à une clé."""
+        return os.path.join(self.directory, key + ".pkl")
+
+    def get(self, key):
+        """
+        Lire une entrée du cache.
+
+        :return: La valeur stockée, ou None si absente.
+        """
+        with self.lock:
+            if key in self.memory:
+                self.memory.move_to_end(key)
+                return self.memory[key]
+        path = self.path(key)
+        try:
+            with open(path, 'rb') as f:
+                value = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return None
+        # La date de modification sert d'horodatage pour l'éviction LRU
+        os.utime(path)
+        self.remember(key, value)
+        return value
+
+    def remember(self, key, value):
+        """Garder une entrée en mémoire en évinçant la moins récemment utilisée."""
+        if self.memory_entries <= 0:
+            return
+        with self.lock:
+            self.memory[key] = value
+            self.memory.move_to_end(key)
+            while len(self.memory) > self.memory_entries:
+                self.memory.popitem(last=False)
+
+    def put(self, key, value):
+        """Écrire une entrée dans le cache puis appliquer l'éviction si nécessaire."""
+        path = self.path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+        self.remember(key, value)
+        self.evict()
+
+    def evict(self):
+        """Supprimer les entrées les moins récemment utilisées jusqu'à repasser sous max_bytes."""
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith(".pkl"):
+                stat = os.stat(os.path.join(self.directory, name))
+                entries.append((stat.st_mtime, stat.st_size, name))
+        total_size = sum(size for _, size, _ in entries)
+        for _, size, name in sorted(entries):
+            if total_size <= self.max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                # Déjà supprimée par un autre processus
+                pass
+            total_size -= size
+
+
 class GraphVisualizerPlotly:
     def __init__(self, graph):
         self.graph = graph
@@ -141,17 +587,39 @@ class GraphVisualizerPlotly:
 class GraphManager:
     """Classe pour gérer le téléchargement, le chargement, l'eulérisation et l'optimisation des trajets dans un graphe urbain."""
 
-    def __init__(self, city_name, file_path):
+    def __init__(self, city_name, file_path, slim=False, cache=None, deterministic=False):
         """
         Initialiser le gestionnaire de graphe.
 
         :param city_name: Nom de la ville pour télécharger le graphe.
         :param file_path: Chemin du fichier pour sauvegarder ou charger le graphe.
+        :param slim: Si vrai, les graphes des quartiers ne gardent que les attributs utiles aux solveurs.
+        :param cache: SolverCache optionnel pour réutiliser eulérisations, circuits et découpages.
+        :param deterministic: Si vrai, les quartiers sont résolus sur un graphe canonique.
         """
         self.city_name = city_name
         self.file_path = file_path
+        self.slim = slim
+        self.cache = cache
+        self.deterministic = deterministic
         self.graph = None
         self.quartier = None
+        self.full_graphs = {}
+        self.circuits = {}
+        self.road_graphs = {}
+        self.distance_cache = OrderedDict()
+        self.connecting_paths = OrderedDict()
+        self.distance_lock = threading.Lock()
+
+    def __getstate__(self):
+        # Le verrou ne se sérialise pas (envoi aux processus de solve_districts_parallel)
+        state = self.__dict__.copy()
+        del state['distance_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.distance_lock = threading.Lock()
 
     def load_or_download_graph(self):
         """
@@ -173,24 +641,209 @@ class GraphManager:
         """
         Charger le graphe à partir du fichier si disponible, sinon le télécharger.
 
+        En mode allégé, une copie réduite aux attributs des solveurs est sauvegardée
+        à côté du fichier complet (``<quartier>.slim.graphml``) et rechargée directement
+        aux exécutions suivantes, sans relire les tags OSM ni les géométries. Une copie
+        à laquelle manque un des attributs de SLIM_EDGE_ATTRIBUTES (sauvegardée par une
+        version précédente) est reconstruite depuis le fichier complet.
+
         :return: Le graphe de la ville.
         """
         # On va tous mettre dans le dossier graph
-        if not os.path.exists("graph"):
-            os.mkdir("graph")
-        os.chdir("graph")
-        self.quartier = []
-        if os.path.exists(self.file_path):
-            print("Chargement du graphe " +
+        os.makedirs("graph", exist_ok=True)
+        file_name = os.path.join("graph", quartiers[i] + ".graphml")
+        slim_file_name = os.path.join("graph", quartiers[i] + ".slim.graphml")
+        graph = None
+        if self.slim and os.path.exists(slim_file_name):
+            print("Chargement du graphe allégé " +
                   quartiers[i] + " depuis le fichier...")
-            self.quartier = ox.load_graphml(quartiers[i] + ".graphml")
-        else:
-            print("Téléchargement du graphe " + quartiers[i] + "...")
-            self.quartier = ox.graph_from_place(
-                quartiers[i], network_type='drive')
-            ox.save_graphml(self.quartier, quartiers[i] + ".graphml")
-        os.chdir("..")
-        return self.quartier
+            graph = ox.load_graphml(slim_file_name)
+            if not self.has_slim_attributes(graph):
+                print("Graphe allégé " + quartiers[i] +
+                      " incomplet, reconstruction...")
+                graph = None
+        if graph is None:
+            if os.path.exists(file_name):
+                print("Chargement du graphe " +
+                      quartiers[i] + " depuis le fichier...")
+                graph = ox.load_graphml(file_name)
+            else:
+                print("Téléchargement du graphe " + quartiers[i] + "...")
+                graph = ox.graph_from_place(
+                    quartiers[i], network_type='drive')
+                ox.save_graphml(graph, file_name)
+            if self.slim:
+                graph = self.slim_graph(graph)
+                ox.save_graphml(graph, slim_file_name)
+        # Graphe local jusqu'ici : plusieurs quartiers peuvent être chargés en parallèle (mode service)
+        self.quartier = graph
+        return graph
+
+    def has_slim_attributes(self, graph):
+        """
+        Vérifier qu'un graphe allégé est à jour : écrit par la version SLIM_VERSION et
+        portant tous les attributs de SLIM_EDGE_ATTRIBUTES.
+
+        :param graph: Le graphe allégé relu depuis le disque.
+        :return: Vrai si chaque attribut est présent sur au moins une arête (ou si le graphe est vide).
+        """
+        if str(graph.graph.get('slim_version')) != str(SLIM_VERSION):
+            return False
+        missing = set(SLIM_EDGE_ATTRIBUTES)
+        for _, _, data in graph.edges(data=True):
+            missing.difference_update(data)
+            if not missing:
+                return True
+        return graph.number_of_edges() == 0
+
+    def slim_graph(self, graph):
+        """
+        Projeter le graphe sur les seuls attributs utilisés par les solveurs.
+
+        Les tags OSM et les géométries ``LineString`` sont abandonnés : ils sont
+        sinon recopiés à chaque ``to_undirected()`` du drone et du postier. La forme
+        des rues courbes est gardée simplifiée, en texte WKT (attribut 'shape') : une
+        chaîne n'est pas recopiée par ``to_undirected()``.
+
+        :param graph: Le graphe complet chargé par osmnx.
+        :return: Un nouveau graphe ne gardant que SLIM_NODE_ATTRIBUTES, SLIM_EDGE_ATTRIBUTES et 'shape'.
+        """
+        slim = graph.__class__()
+        slim.graph.update(graph.graph)
+        slim.graph['slim_version'] = SLIM_VERSION
+        # Tolérance en degrés si le graphe n'est pas projeté (un degré de longitude est plus court qu'un degré de latitude)
+        tolerance = SLIM_SHAPE_TOLERANCE
+        if not ox.projection.is_projected(graph.graph.get('crs', 'epsg:4326')):
+            tolerance = math.degrees(SLIM_SHAPE_TOLERANCE / EARTH_RADIUS)
+        slim.add_nodes_from(
+            (node, {key: data[key] for key in SLIM_NODE_ATTRIBUTES if key in data})
+            for node, data in graph.nodes(data=True))
+        for u, v, k, data in graph.edges(keys=True, data=True):
+            slim_data = {key: data[key]
+                         for key in SLIM_EDGE_ATTRIBUTES if key in data}
+            if 'geometry' in data:
+                slim_data['shape'] = data['geometry'].simplify(tolerance).wkt
+            slim.add_edge(u, v, k, **slim_data)
+        return slim
+
+    def get_full_graph_district(self, i, quartiers):
+        """
+        Recharger paresseusement le graphe complet d'un quartier (tous les attributs OSM).
+
+        Utile pour l'export une fois les trajets calculés sur le graphe allégé.
+        Le graphe complet est gardé en mémoire après le premier appel, par nom de quartier.
+
+        :return: Le graphe complet du quartier.
+        """
+        if quartiers[i] not in self.full_graphs:
+            self.full_graphs[quartiers[i]] = ox.load_graphml(
+                os.path.join("graph", quartiers[i] + ".graphml"))
+        return self.full_graphs[quartiers[i]]
+
+    def rehydrate_edges(self, i, quartiers, edges):
+        """
+        Retrouver les attributs complets (nom, géométrie, tags...) d'une liste d'arêtes.
+
+        Les arêtes ajoutées par l'eulérisation, absentes du graphe OSM, sont
+        renvoyées avec un dictionnaire vide.
+
+        :param edges: Les arêtes (u, v) d'un trajet calculé sur le graphe allégé.
+        :return: La liste des triplets (u, v, attributs).
+        """
+        full_graph = self.get_full_graph_district(i, quartiers)
+        rehydrated = []
+        for u, v in edges:
+            if full_graph.has_edge(u, v):
+                data = next(iter(full_graph[u][v].values()))
+            elif full_graph.has_edge(v, u):
+                data = next(iter(full_graph[v][u].values()))
+            else:
+                data = {}
+            rehydrated.append((u, v, dict(data)))
+        return rehydrated
+
+    def export_routes(self, i, quartiers, circuits, file_name):
+        """
+        Exporter les trajets des véhicules en CSV, avec le nom et la classe de chaque rue.
+
+        Les attributs sont relus depuis le graphe complet (rehydrate_edges) au moment de
+        l'export seulement : les solveurs ne travaillent que sur le graphe allégé.
+
+        :param circuits: Les arêtes (u, v) de chaque véhicule.
+        :param file_name: Nom du fichier CSV créé dans le dossier exports.
+        """
+        os.makedirs("exports", exist_ok=True)
+        with open(os.path.join("exports", file_name), 'w', newline='') as csvfile:
+            writer = csv.writer(csvfile, delimiter=';')
+            writer.writerow(["vehicule", "ordre", "u", "v",
+                            "nom", "highway", "longueur"])
+            for vehicle, circuit in enumerate(circuits):
+                for order, (u, v, data) in enumerate(self.rehydrate_edges(i, quartiers, circuit)):
+                    writer.writerow([vehicle + 1, order, u, v, data.get('name', ''),
+                                     data.get('highway', ''), data.get('length', '')])
+
+    def merge_districts(self, graphs):
+        """
+        Composer les graphes des quartiers en un seul graphe puis répartir les rues frontalières.
+
+        Les noeuds partagés sont reconnus par leur identifiant OSM ; les noeuds distincts
+        situés à moins de NODE_MATCH_TOLERANCE mètres sont fusionnés grâce à un KD-tree.
+        Chaque rue est ensuite attribuée à un seul quartier : celui qui la contient, ou,
+        pour une rue frontalière, celui dont le centre est le plus proche de son milieu.
+
+        :param graphs: Les graphes des quartiers, dans l'ordre de la liste des quartiers.
+        :return: Le graphe fusionné et la liste des sous-graphes disjoints de chaque quartier.
+        """
+        merged = nx.compose_all(graphs)
+
+        # Fusion spatiale des noeuds d'identifiants différents au même endroit
+        nodes, coords = projected_coordinates(merged)
+        mapping = {}
+        for a, b in sorted(cKDTree(coords).query_pairs(NODE_MATCH_TOLERANCE)):
+            root_a = mapping.get(nodes[a], nodes[a])
+            root_b = mapping.get(nodes[b], nodes[b])
+            if root_a != root_b:
+                root, other = min(root_a, root_b), max(root_a, root_b)
+                for node, target in mapping.items():
+                    if target == other:
+                        mapping[node] = root
+                mapping[other] = root
+        if mapping:
+            # Les arêtes entre deux noeuds fusionnés deviendraient des boucles : on les retire
+            # avant la fusion, sans toucher aux vraies boucles OSM (rues en cul-de-sac circulaire)
+            merged.remove_edges_from([(u, v, k) for u, v, k in merged.edges(keys=True)
+                                      if u != v and mapping.get(u, u) == mapping.get(v, v)])
+            merged = nx.relabel_nodes(merged, mapping)
+            # Rues en double après fusion : même extrémités et même longueur
+            duplicates = []
+            for u, v in sorted(set(merged.edges())):
+                seen = []
+                for k, data in merged[u][v].items():
+                    length = data.get('length', 1)
+                    if any(abs(length - other) < NODE_MATCH_TOLERANCE for other in seen):
+                        duplicates.append((u, v, k))
+                    else:
+                        seen.append(length)
+            merged.remove_edges_from(duplicates)
+
+        district_nodes = [{mapping.get(node, node) for node in graph.nodes()}
+                          for graph in graphs]
+        centers = [projected_coordinates(merged, district)[1].mean(axis=0)
+                   for district in district_nodes]
+
+        owned_edges = [[] for _ in graphs]
+        for u, v, k in merged.edges(keys=True):
+            owners = [i for i, district in enumerate(district_nodes)
+                      if u in district and v in district]
+            if not owners:
+                owners = [i for i, district in enumerate(district_nodes)
+                          if u in district or v in district]
+            if len(owners) > 1:
+                middle = projected_coordinates(merged, (u, v))[1].mean(axis=0)
+                owners.sort(key=lambda i: np.linalg.norm(centers[i] - middle))
+            owned_edges[owners[0]].append((u, v, k))
+
+        return merged, [merged.edge_subgraph(edges).copy() for edges in owned_edges]
 
     def get_graph_info(self):
         """
@@ -208,23 +861,51 @@ class GraphManager:
         """
         return nx.info(self.quartier[i])
 
-    def eulerize_graph(self, graph):
+    def eulerize_graph(self, graph, fingerprint=None):
         """
         Rendre le graphe eulérien en ajoutant des arêtes.
 
         je crée des routes entre les noeuds de degré impair pour les rendre pair
         sauf que sur lors du parcours je prend le chemin le plus court qui mene de u à v avec des vrai routes existante 
 
+        Chaque arête ajoutée coûte le trajet à vide correspondant : les noeuds impairs sont
+        appariés glouton par distance routière croissante, parmi les ODD_NODE_CANDIDATES
+        noeuds impairs les plus proches de chacun.
+
+        Les arêtes ajoutées sont mises en cache si un SolverCache est configuré.
+
         :param graph: Le graphe à eulériser.
+        :param fingerprint: Empreinte du graphe si déjà calculée.
         :return: Le graphe eulérisé.
         """
         undirected_graph = graph.to_undirected()
-        if not nx.is_eulerian(undirected_graph):
-            odd_degree_nodes = [
-                node for node, degree in undirected_graph.degree() if degree % 2 == 1]
-            for i in range(0, len(odd_degree_nodes), 2):
-                undirected_graph.add_edge(
-                    odd_degree_nodes[i], odd_degree_nodes[i + 1], length=0)
+        key = None
+        augmentation = None
+        if self.cache is not None:
+            key = self.cache.key(fingerprint or graph_fingerprint(
+                graph), 'augmentation')
+            augmentation = self.cache.get(key)
+
+        if augmentation is not None:
+            undirected_graph.add_edges_from(augmentation)
+        else:
+            augmentation = []
+            if not nx.is_eulerian(undirected_graph):
+                odd_degree_nodes = [
+                    node for node, degree in undirected_graph.degree() if degree % 2 == 1]
+                for u, v in self.pair_odd_nodes(graph, odd_degree_nodes, fingerprint):
+                    augmentation.append((u, v, {'length': 0}))
+                undirected_graph.add_edges_from(augmentation)
+            # Un quartier découpé (voir merge_districts) peut être non connexe :
+            # on relie les composantes par des paires d'arêtes pour garder les degrés pairs
+            components = [next(iter(component))
+                          for component in nx.connected_components(undirected_graph)]
+            for a, b in zip(components, components[1:]):
+                augmentation.extend(
+                    [(a, b, {'length': 0}), (a, b, {'length': 0})])
+                undirected_graph.add_edges_from(augmentation[-2:])
+            if key is not None:
+                self.cache.put(key, augmentation)
 
         # Vérifier et assigner l'attribut 'length' pour toutes les arêtes
         for u, v, data in undirected_graph.edges(data=True):
@@ -237,20 +918,101 @@ class GraphManager:
                     data['length'] = 1
         return undirected_graph
 
-    def solve_chinese_postman(self, graph, num_vehicles):
+    def pair_odd_nodes(self, graph, odd_nodes, fingerprint=None):
         """
-        Résoudre le problème du postier chinois pour optimiser les trajets des véhicules de déneigement.
+        Apparier les noeuds de degré impair en limitant la distance routière entre paires.
 
-        :param graph: Le graphe pour lequel résoudre le problème.
-        :param num_vehicles: Le nombre de véhicules disponibles.
-        :return: Le circuit optimal pour chaque véhicule, la longueur totale et le temps de déneigement.
+        Appariement glouton : les paires candidates (chaque noeud et ses ODD_NODE_CANDIDATES
+        noeuds impairs les plus proches sur road_graph) sont retenues par distance croissante ;
+        un noeud resté seul est apparié au plus proche noeud libre, et ceux qu'aucun chemin
+        ne relie (composantes différentes) sont appariés entre eux dans l'ordre.
+
+        :param graph: Le graphe du quartier.
+        :param odd_nodes: Les noeuds de degré impair (en nombre pair).
+        :param fingerprint: Empreinte du graphe si déjà calculée.
+        :return: La liste des paires (u, v).
+        """
+        road_graph = self.road_graph(graph, fingerprint)
+        targets = set(odd_nodes)
+        candidates = []
+        for rank, node in enumerate(odd_nodes):
+            for distance, other in nearest_targets(road_graph, node, targets, ODD_NODE_CANDIDATES):
+                candidates.append((distance, rank, node, other))
+        candidates.sort(key=lambda candidate: candidate[:2])
+
+        pairs = []
+        for _, _, u, v in candidates:
+            if u in targets and v in targets:
+                targets -= {u, v}
+                pairs.append((u, v))
+        for node in odd_nodes:
+            if node in targets:
+                targets.discard(node)
+                nearest = nearest_targets(road_graph, node, targets, 1)
+                if nearest:
+                    targets.discard(nearest[0][1])
+                    pairs.append((node, nearest[0][1]))
+                else:
+                    targets.add(node)
+        leftovers = [node for node in odd_nodes if node in targets]
+        pairs.extend(zip(leftovers[::2], leftovers[1::2]))
+        return pairs
+
+    def get_eulerian_circuit(self, graph, fingerprint=None):
         """
-        eulerized_graph = self.eulerize_graph(graph)
-        eulerian_circuit = list(nx.eulerian_circuit(
-            eulerized_graph, source=list(eulerized_graph.nodes())[0]))
+        Calculer (ou relire depuis le cache) le circuit eulérien du graphe eulérisé.
 
-        total_distance = sum(eulerized_graph[u][v].get(
-            'length', 1) for u, v in eulerian_circuit)
+        Le circuit est aussi gardé en mémoire par empreinte : les replanifications
+        successives ne relancent pas l'eulérisation, même sans SolverCache. Les plus
+        courts chemins qui remplacent les arêtes ajoutées par l'eulérisation sont mis en
+        cache avec lui et rechargés dans connecting_path.
+
+        :param graph: Le graphe du quartier.
+        :param fingerprint: Empreinte du graphe si déjà calculée.
+        :return: La liste des arêtes (u, v, longueur en mètres) du circuit.
+        """
+        fingerprint = fingerprint or graph_fingerprint(graph)
+        if fingerprint in self.circuits:
+            return self.circuits[fingerprint]
+        key = None
+        if self.cache is not None:
+            key = self.cache.key(fingerprint, 'circuit')
+            connections_key = self.cache.key(fingerprint, 'connections')
+            eulerian_circuit = self.cache.get(key)
+            connections = self.cache.get(connections_key)
+            if eulerian_circuit is not None and connections is not None:
+                for (u, v), connection in connections.items():
+                    self.remember_connecting_path(
+                        (fingerprint, u, v), connection)
+                self.circuits[fingerprint] = eulerian_circuit
+                return eulerian_circuit
+
+        eulerized_graph = self.eulerize_graph(graph, fingerprint)
+        # Longueur de la rue, ou du plus court chemin réel qui remplace une arête ajoutée par l'eulérisation
+        eulerian_circuit = [(u, v, edge_length(graph, u, v) if graph.has_edge(u, v) or graph.has_edge(v, u)
+                             else self.connecting_path(graph, u, v, fingerprint)[1])
+                            for u, v in nx.eulerian_circuit(
+                                eulerized_graph, source=list(eulerized_graph.nodes())[0])]
+        if key is not None:
+            self.cache.put(key, eulerian_circuit)
+            self.cache.put(connections_key, {(u, v): self.connecting_path(graph, u, v, fingerprint)
+                                             for u, v, _ in eulerian_circuit
+                                             if not (graph.has_edge(u, v) or graph.has_edge(v, u))})
+        self.circuits[fingerprint] = eulerian_circuit
+        return eulerian_circuit
+
+    def split_circuit(self, eulerian_circuit, num_vehicles):
+        """
+        Découper le circuit eulérien en segments de longueur équilibrée, un par véhicule.
+
+        Cette étape est linéaire et ne dépend que du circuit : changer la taille de la
+        flotte réutilise le circuit déjà calculé.
+
+        :param eulerian_circuit: Les arêtes (u, v, longueur) du circuit.
+        :param num_vehicles: Le nombre de véhicules disponibles.
+        :return: Les arêtes de chaque véhicule et la distance parcourue par chacun.
+        """
+        total_distance = sum(length for _, _, length in eulerian_circuit)
         segment_length = total_distance / num_vehicles
 
         circuits = [[] for _ in range(num_vehicles)]
@@ -258,8 +1020,7 @@ class GraphManager:
         current_vehicle = 0
         current_distance = 0
 
-        for u, v in eulerian_circuit:
-            length = eulerized_graph[u][v].get('length', 1)
+        for u, v, length in eulerian_circuit:
             if current_distance + length > segment_length and current_vehicle < num_vehicles - 1:
                 current_vehicle += 1
                 current_distance = 0
@@ -267,6 +1028,55 @@ class GraphManager:
             vehicle_distances[current_vehicle] += length
             current_distance += length
 
+        return circuits, vehicle_distances
+
+    def split_circuit_distances(self, prefix_lengths, num_vehicles):
+        """
+        Distances par véhicule du découpage de split_circuit, sans reparcourir le circuit.
+
+        Chaque frontière est trouvée par dichotomie dans les longueurs cumulées du circuit :
+        une évaluation coûte O(num_vehicles · log n) au lieu de O(n), ce qui permet de
+        tester de grandes flottes (voir full_rapport.optimize_fleet_size).
+
+        :param prefix_lengths: Les longueurs cumulées du circuit, en commençant par 0.
+        :param num_vehicles: Le nombre de véhicules disponibles.
+        :return: La distance parcourue par chaque véhicule.
+        """
+        segment_length = prefix_lengths[-1] / num_vehicles
+        last = len(prefix_lengths) - 1
+        vehicle_distances = []
+        start = 0
+        for vehicle in range(num_vehicles - 1):
+            end = bisect.bisect_right(
+                prefix_lengths, prefix_lengths[start] + segment_length) - 1
+            if vehicle > 0:
+                # L'arête qui a déclenché le changement de véhicule est toujours prise
+                end = max(end, min(start + 1, last))
+            vehicle_distances.append(
+                prefix_lengths[end] - prefix_lengths[start])
+            start = end
+        vehicle_distances.append(prefix_lengths[last] - prefix_lengths[start])
+        return vehicle_distances
+
+    def solve_chinese_postman(self, graph, num_vehicles, fingerprint=None):
+        """
+        Résoudre le problème du postier chinois pour optimiser les trajets des véhicules de déneigement.
+
+        :param graph: Le graphe pour lequel résoudre le problème.
+        :param num_vehicles: Le nombre de véhicules disponibles.
+        :param fingerprint: Empreinte du graphe si déjà calculée.
+        :return: Le circuit optimal pour chaque véhicule, la longueur totale en km et le temps de déneigement.
+        """
+        eulerian_circuit = self.get_eulerian_circuit(graph, fingerprint)
+        total_distance = sum(length for _, _, length in eulerian_circuit)
+
+        # Le découpage, linéaire, est refait à chaque appel : seul le circuit est mis en cache
+        circuits, vehicle_distances = self.split_circuit(
+            eulerian_circuit, num_vehicles)
+        # Le circuit est en mètres, le modèle de coût en km
+        total_distance /= 1000
+        vehicle_distances = [distance / 1000 for distance in vehicle_distances]
+
         # Calculer le temps de déneigement pour chaque véhicule
         times_type_I = [distance /
                         VEHICLE_SPEED_TYPE_I for distance in vehicle_distances]
@@ -278,15 +1088,422 @@ class GraphManager:
 
         return circuits, total_distance, max_time_type_I, max_time_type_II
 
+    def road_graph(self, graph, fingerprint=None):
+        """
+        Réseau non orienté réduit aux longueurs des rues, gardé en mémoire par empreinte.
+
+        Les plus courts chemins y sont bien plus rapides que sur une vue non orientée
+        du multigraphe osmnx.
 
-def optimize_drone_path(graph):
+        :param graph: Le graphe du quartier.
+        :param fingerprint: Empreinte du graphe si déjà calculée.
+        :return: Un nx.Graph dont chaque arête porte la plus petite longueur des rues parallèles.
+        """
+        fingerprint = fingerprint or graph_fingerprint(graph)
+        if fingerprint not in self.road_graphs:
+            road_graph = nx.Graph()
+            road_graph.add_nodes_from(graph.nodes())
+            for u, v, data in graph.edges(data=True):
+                length = data.get('length', 1)
+                if not road_graph.has_edge(u, v) or length < road_graph[u][v]['length']:
+                    road_graph.add_edge(u, v, length=length)
+            self.road_graphs[fingerprint] = road_graph
+        return self.road_graphs[fingerprint]
+
+    def shortest_paths_from(self, graph, source, fingerprint=None):
+        """
+        Distances et prédécesseurs depuis un noeud (Dijkstra sur le graphe non orienté).
+
+        Les résultats sont gardés en mémoire par (empreinte du graphe, source) pour
+        que les replanifications successives ne relancent pas les mêmes calculs ; au-delà
+        de DISTANCE_CACHE_ENTRIES sources, la moins récemment utilisée est oubliée.
+
+        :param graph: Le graphe du quartier.
+        :param source: Le noeud de départ.
+        :param fingerprint: Empreinte du graphe si déjà calculée.
+        :return: Le dictionnaire des prédécesseurs et celui des distances.
+        """
+        fingerprint = fingerprint or graph_fingerprint(graph)
+        key = (fingerprint, source)
+        with self.distance_lock:
+            if key in self.distance_cache:
+                self.distance_cache.move_to_end(key)
+                return self.distance_cache[key]
+        result = nx.dijkstra_predecessor_and_distance(
+            self.road_graph(graph, fingerprint), source, weight='length')
+        with self.distance_lock:
+            self.distance_cache[key] = result
+            while len(self.distance_cache) > DISTANCE_CACHE_ENTRIES:
+                self.distance_cache.popitem(last=False)
+        return result
+
+    def shortest_path_between(self, graph, source, target, fingerprint=None, upper_bound=None):
+        """
+        Plus court chemin entre deux noeuds sur road_graph.
+
+        Avec une borne supérieure connue (longueur d'un chemin existant), la recherche
+        est un Dijkstra limité à ce rayon ; sinon un Dijkstra bidirectionnel.
+
+        :param graph: Le graphe du quartier.
+        :param source: Le noeud de départ.
+        :param target: Le noeud d'arrivée.
+        :param fingerprint: Empreinte du graphe si déjà calculée.
+        :param upper_bound: Longueur d'un chemin connu entre les deux noeuds, en mètres.
+        :return: Les arêtes (u, v, longueur) du chemin, ou None si les noeuds ne sont pas reliés.
+        """
+        road_graph = self.road_graph(graph, fingerprint)
+        try:
+            if upper_bound is not None:
+                _, path = nx.single_source_dijkstra(
+                    road_graph, source, target, cutoff=upper_bound + 1e-6, weight='length')
+            else:
+                _, path = nx.bidirectional_dijkstra(
+                    road_graph, source, target, weight='length')
+        except nx.NetworkXNoPath:
+            return None
+        return [(a, b, road_graph[a][b]['length']) for a, b in zip(path, path[1:])]
+
+    def get_spatial_index(self, graph, fingerprint=None):
+        """
+        Retourner l'index spatial du graphe, construit une seule fois puis gardé dans le cache.
+
+        :param graph: Le graphe du quartier.
+        :param fingerprint: Empreinte du graphe si déjà calculée.
+        :return: Le SpatialIndex du graphe.
+        """
+        key = None
+        if self.cache is not None:
+            key = self.cache.key(
+                fingerprint or graph_fingerprint(graph), 'spatial_index')
+            spatial_index = self.cache.get(key)
+            if spatial_index is not None:
+                return spatial_index
+        spatial_index = SpatialIndex(graph)
+        if key is not None:
+            self.cache.put(key, spatial_index)
+        return spatial_index
+
+    def remaining_streets(self, graph, completed_edges=(), fingerprint=None):
+        """
+        Rues encore à déneiger, dans l'ordre du circuit eulérien (gardé en mémoire).
+
+        Les rues déjà faites, les seconds passages et les arêtes ajoutées par l'eulérisation
+        sont retirés ; la séquence obtenue a donc des trous, à combler par connecting_path.
+
+        :param graph: Le graphe du quartier.
+        :param completed_edges: Les arêtes (u, v) déjà déneigées, dans un sens ou dans l'autre.
+        :param fingerprint: Empreinte du graphe si déjà calculée.
+        :return: La liste des rues (u, v, longueur en mètres, borne) ; la borne est la longueur des
+            rues sautées juste avant, qui relient déjà la rue précédente à celle-ci (None si une
+            arête ajoutée par l'eulérisation a été sautée).
+        """
+        done = {frozenset(edge) for edge in completed_edges}
+        remaining = []
+        skipped = 0
+        for u, v, _ in self.get_eulerian_circuit(graph, fingerprint):
+            street = frozenset((u, v))
+            if not (graph.has_edge(u, v) or graph.has_edge(v, u)):
+                skipped = None
+                continue
+            if street in done:
+                if skipped is not None:
+                    skipped += edge_length(graph, u, v)
+                continue
+            done.add(street)
+            remaining.append((u, v, edge_length(graph, u, v), skipped))
+            skipped = 0
+        return remaining
+
+    def connecting_path(self, graph, source, target, fingerprint=None, upper_bound=None):
+        """
+        Trajet à vide entre deux rues : plus court chemin, ou vol d'oiseau entre composantes non reliées.
+
+        :param graph: Le graphe du quartier.
+        :param source: Le noeud de départ.
+        :param target: Le noeud d'arrivée.
+        :param fingerprint: Empreinte du graphe si déjà calculée.
+        :param upper_bound: Longueur d'un chemin connu entre les deux noeuds (voir remaining_streets).
+        :return: Les arêtes (u, v, longueur) du chemin (vide pour un saut) et sa longueur en mètres.
+        """
+        # Les mêmes trous reviennent d'une replanification à l'autre : résultats gardés par (empreinte, u, v)
+        key = (fingerprint or graph_fingerprint(graph), source, target)
+        with self.distance_lock:
+            if key in self.connecting_paths:
+                self.connecting_paths.move_to_end(key)
+                return self.connecting_paths[key]
+        path = self.shortest_path_between(
+            graph, source, target, key[0], upper_bound)
+        if path is None:
+            _, coords = projected_coordinates(graph, (source, target))
+            connection = [], float(np.linalg.norm(coords[1] - coords[0]))
+        else:
+            connection = path, sum(length for _, _, length in path)
+        self.remember_connecting_path(key, connection)
+        return connection
+
+    def remember_connecting_path(self, key, connection):
+        """Garder un trajet à vide en mémoire en évinçant le moins récemment utilisé."""
+        with self.distance_lock:
+            self.connecting_paths[key] = connection
+            self.connecting_paths.move_to_end(key)
+            while len(self.connecting_paths) > CONNECTING_PATH_ENTRIES:
+                self.connecting_paths.popitem(last=False)
+
+    def replan_routes(self, graph, vehicle_positions, completed_edges, fingerprint=None):
+        """
+        Redistribuer les rues non encore déneigées entre les véhicules encore en service.
+
+        Le circuit eulérien (gardé en mémoire) est parcouru dans l'ordre en retirant les rues
+        déjà faites et les arêtes ajoutées par l'eulérisation ; chaque trou ainsi créé est
+        comblé par un plus court chemin sur le réseau (trajet à vide). La séquence obtenue
+        est découpée en segments de longueur équilibrée, et chaque segment est confié au
+        véhicule le plus proche de son début. Aucune nouvelle eulérisation n'est nécessaire.
+
+        Seul le passage entre deux composantes non reliées du réseau (quartier découpé par
+        merge_districts) reste un saut, compté à vol d'oiseau.
+
+        :param graph: Le graphe du quartier.
+        :param vehicle_positions: Dictionnaire {véhicule: noeud courant} des véhicules encore disponibles.
+        :param completed_edges: Les arêtes (u, v) déjà déneigées, dans un sens ou dans l'autre.
+        :param fingerprint: Empreinte du graphe si déjà calculée.
+        :return: Les arêtes de chaque véhicule et la distance totale de chacun en mètres (approche et trajets à vide compris).
+        """
+        if not vehicle_positions:
+            raise ValueError(
+                "Aucun véhicule disponible pour la replanification")
+
+        fingerprint = fingerprint or graph_fingerprint(graph)
+        remaining = self.remaining_streets(graph, completed_edges, fingerprint)
+
+        vehicles = list(vehicle_positions)
+        routes = {vehicle: [] for vehicle in vehicles}
+        distances = {vehicle: 0 for vehicle in vehicles}
+        if not remaining:
+            return routes, distances
+
+        # Séquence continue : (u, v, longueur, rue à déneiger) ; u == None marque un saut à vol d'oiseau
+        sequence = []
+        for u, v, length, upper_bound in remaining:
+            if sequence and sequence[-1][1] != u:
+                path, gap = self.connecting_path(
+                    graph, sequence[-1][1], u, fingerprint, upper_bound)
+                if path:
+                    sequence.extend((a, b, length, False) for a, b, length in path)
+                else:
+                    sequence.append((None, u, gap, False))
+            sequence.append((u, v, length, True))
+
+        segments, _ = self.split_circuit(
+            [(u, v, length) for u, v, length, _ in sequence], len(vehicles))
+        offsets = list(itertools.accumulate(
+            (len(segment) for segment in segments), initial=0))
+        segment_items = []
+        for index in range(len(segments)):
+            items = sequence[offsets[index]:offsets[index + 1]]
+            # Les trajets à vide en début et fin de segment sont remplacés par l'approche
+            required = [i for i, item in enumerate(items) if item[3]]
+            segment_items.append(
+                items[required[0]:required[-1] + 1] if required else [])
+
+        # Affectation gloutonne : le couple (véhicule, segment) le plus proche d'abord
+        candidates = []
+        for vehicle in vehicles:
+            _, dist = self.shortest_paths_from(
+                graph, vehicle_positions[vehicle], fingerprint)
+            for index, items in enumerate(segment_items):
+                if items:
+                    candidates.append(
+                        (dist.get(items[0][0], float('inf')), vehicle, index))
+        candidates.sort(key=lambda candidate: candidate[0])
+
+        assigned_vehicles = set()
+        assigned_segments = set()
+        for approach, vehicle, index in candidates:
+            if vehicle in assigned_vehicles or index in assigned_segments:
+                continue
+            assigned_vehicles.add(vehicle)
+            assigned_segments.add(index)
+            pred, _ = self.shortest_paths_from(
+                graph, vehicle_positions[vehicle], fingerprint)
+            items = segment_items[index]
+            approach_path = [items[0][0]]
+            while approach_path[-1] != vehicle_positions[vehicle] and pred.get(approach_path[-1]):
+                approach_path.append(pred[approach_path[-1]][0])
+            approach_path.reverse()
+            routes[vehicle] = [(approach_path[i], approach_path[i + 1])
+                               for i in range(len(approach_path) - 1)] + \
+                [(u, v) for u, v, _, _ in items if u is not None]
+            distances[vehicle] = sum(length for _, _, length, _ in items) + \
+                (approach if approach != float('inf') else 0)
+
+        return routes, distances
+
+    def solve_mixed_fleet(self, graph, fleet, depot=None, fingerprint=None):
+        """
+        Tournées d'une flotte mixte de véhicules de type I et II avec retours au dépôt.
+
+        Construction : la séquence des rues du circuit eulérien (en cache) est découpée en
+        portions contiguës proportionnelles à la vitesse de chaque véhicule ; dans chaque
+        portion, un aller-retour au dépôt est inséré dès que la capacité serait dépassée.
+        Amélioration : chaque frontière entre deux portions voisines est déplacée par
+        dichotomie pour équilibrer leurs temps, en quelques passes.
+
+        Les trous de la séquence (arêtes ajoutées par l'eulérisation, seconds passages) sont
+        comblés par des plus courts chemins (connecting_path), comme les allers-retours au
+        dépôt : les trajets rendus sont continus, sauf entre composantes non reliées du réseau.
+        Les distances sont en km réels, comme postman_distance et les coûts de compute_costs.
+
+        :param graph: Le graphe du quartier.
+        :param fleet: Le nombre de véhicules de chaque type, par exemple {'I': 2, 'II': 1}.
+        :param depot: Le noeud du dépôt (par défaut, le noeud le plus proche du centre du quartier).
+        :param fingerprint: Empreinte du graphe si déjà calculée.
+        :return: La liste des véhicules (type, trajet, distance en km, temps en h, retours au dépôt, coût)
+            et le coût total de la flotte.
+        """
+        vehicle_types = [vehicle_type for vehicle_type in sorted(fleet)
+                         for _ in range(fleet[vehicle_type])]
+        if not vehicle_types:
+            raise ValueError("La flotte ne contient aucun véhicule")
+
+        fingerprint = fingerprint or graph_fingerprint(graph)
+        streets = self.remaining_streets(graph, fingerprint=fingerprint)
+        required = [(u, v, length / 1000) for u, v, length, _ in streets]
+        # Trajets à vide entre deux rues consécutives de la séquence, calculés une seule fois
+        gaps = {}
+        for index in range(1, len(streets)):
+            previous, (u, _, _, upper_bound) = streets[index - 1][1], streets[index]
+            if previous != u:
+                path, gap = self.connecting_path(
+                    graph, previous, u, fingerprint, upper_bound)
+                gaps[index] = ([(a, b) for a, b, _ in path], gap / 1000)
+
+        nodes, coords = projected_coordinates(graph)
+        position = dict(zip(nodes, coords.tolist()))
+        if depot is None:
+            depot = nodes[int(np.argmin(np.linalg.norm(
+                coords - coords.mean(axis=0), axis=1)))]
+        pred, depot_distances = self.shortest_paths_from(
+            graph, depot, fingerprint)
+
+        def depot_distance(node):
+            # Distance réseau au dépôt en km, à vol d'oiseau si le noeud n'est pas relié
+            if node in depot_distances:
+                return depot_distances[node] / 1000
+            return math.dist(position[node], position[depot]) / 1000
+
+        def depot_path(node):
+            path = [node]
+            while path[-1] != depot and pred.get(path[-1]):
+                path.append(pred[path[-1]][0])
+            return path
+
+        def evaluate(start, end, vehicle_type, build_route=False):
+            capacity = VEHICLE_TYPES[vehicle_type]['capacity']
+            route = []
+            refills = 0
+            if start >= end:
+                return 0, 0, refills, route
+            distance = depot_distance(required[start][0])
+            if build_route:
+                path = depot_path(required[start][0])[::-1]
+                route.extend(zip(path, path[1:]))
+            load = 0
+            previous = None
+            for index in range(start, end):
+                u, v, length = required[index]
+                if load + length > capacity and load > 0:
+                    # Aller-retour au dépôt pour recharger
+                    distance += depot_distance(previous) + depot_distance(u)
+                    refills += 1
+                    load = 0
+                    if build_route:
+                        out_path = depot_path(previous)
+                        back_path = depot_path(u)[::-1]
+                        route.extend(zip(out_path, out_path[1:]))
+                        route.extend(zip(back_path, back_path[1:]))
+                elif previous is not None and previous != u:
+                    gap_route, gap = gaps[index]
+                    distance += gap
+                    if build_route:
+                        route.extend(gap_route)
+                load += length
+                distance += length
+                previous = v
+                if build_route:
+                    route.append((u, v))
+            distance += depot_distance(previous)
+            if build_route:
+                path = depot_path(previous)
+                route.extend(zip(path, path[1:]))
+            return distance / VEHICLE_TYPES[vehicle_type]['speed'], distance, refills, route
+
+        # Construction : portions proportionnelles à la vitesse de chaque véhicule
+        speeds = [VEHICLE_TYPES[vehicle_type]['speed']
+                  for vehicle_type in vehicle_types]
+        total_length = sum(length for _, _, length in required)
+        boundaries = [0]
+        target = 0
+        covered = 0
+        index = 0
+        for speed in speeds[:-1]:
+            target += total_length * speed / sum(speeds)
+            while index < len(required) and covered < target:
+                covered += required[index][2]
+                index += 1
+            boundaries.append(index)
+        boundaries.append(len(required))
+
+        # Amélioration : équilibrer chaque paire de portions voisines par dichotomie
+        for _ in range(3):
+            for i in range(1, len(vehicle_types)):
+                low, high = boundaries[i - 1], boundaries[i + 1]
+                while low < high:
+                    middle = (low + high) // 2
+                    left = evaluate(boundaries[i - 1], middle,
+                                    vehicle_types[i - 1])[0]
+                    right = evaluate(middle, boundaries[i + 1],
+                                     vehicle_types[i])[0]
+                    if left < right:
+                        low = middle + 1
+                    else:
+                        high = middle
+                boundaries[i] = low
+
+        vehicles = []
+        total_cost = sum(VEHICLE_TYPES[vehicle_type]['fixed_cost']
+                         for vehicle_type in set(vehicle_types))
+        for i, vehicle_type in enumerate(vehicle_types):
+            time, distance, refills, route = evaluate(
+                boundaries[i], boundaries[i + 1], vehicle_type, build_route=True)
+            cost = VEHICLE_TYPES[vehicle_type]['km_cost'] * \
+                distance + hourly_cost(time, vehicle_type)
+            total_cost += cost
+            vehicles.append({"type": vehicle_type, "route": route, "distance": distance,
+                             "time": time, "refills": refills, "cost": cost})
+        return vehicles, total_cost
+
+
+def optimize_drone_path(graph, cache=None):
     """
     Optimiser le trajet du drone en utilisant le problème du postier chinois.
 
     :param graph: Le graphe pour lequel optimiser le trajet.
-    :return: Le chemin optimisé et la distance totale.
+    :param cache: SolverCache optionnel ; le résultat est relu si le graphe n'a pas changé.
+    :return: Le chemin optimisé et la distance totale en km.
     """
+    key = None
+    if cache is not None:
+        key = cache.key(graph_fingerprint(graph), 'drone')
+        result = cache.get(key)
+        if result is not None:
+            return result
+
     undirected_graph = graph.to_undirected()
+    # nx.eulerize exige un graphe connexe : on relie les composantes d'un quartier découpé
+    components = [next(iter(component))
+                  for component in nx.connected_components(undirected_graph)]
+    for a, b in zip(components, components[1:]):
+        undirected_graph.add_edge(a, b, length=0)
     eulerized_graph = nx.eulerize(undirected_graph)
 
     # Vérifier et assigner l'attribut 'length' pour toutes les arêtes
@@ -299,23 +1516,470 @@ def optimize_drone_path(graph):
                 data['length'] = 1  # Assign default length if no path is found
 
     eulerian_circuit = list(nx.eulerian_circuit(
-        eulerized_graph, source=list(eulerized_graph.nodes())[0]))
+        eulerized_graph, source=list(eulerized_graph.nodes())[0], keys=True))
     drone_path = []
     total_distance = 0
-    for u, v in eulerian_circuit:
+    for u, v, k in eulerian_circuit:
         drone_path.append(u)
-        # Default length of 1 if not found
-        total_distance += eulerized_graph[u][v].get('length', 1)
+        # Longueur de la rue survolée, ou de l'arête qui relie deux composantes
+        total_distance += edge_length(graph, u, v) if graph.has_edge(u, v) or graph.has_edge(v, u) \
+            else eulerized_graph[u][v][k].get('length', 1)
+    drone_path.append(drone_path[0])  # Retourner au point de départ
+    total_distance /= 1000
+    if key is not None:
+        cache.put(key, (drone_path, total_distance))
+    return drone_path, total_distance
+
+
+def plan_drone_coverage(graph, sensor_radius=DRONE_SENSOR_RADIUS, cache=None):
+    """
+    Planifier le vol du drone comme un problème de couverture géométrique.
+
+    Le drone n'a pas besoin de suivre les rues : il suffit que chaque tronçon passe à
+    moins de ``sensor_radius`` mètres de sa trajectoire. Chaque rue est échantillonnée le
+    long de sa géométrie (``geometry`` d'osmnx, sa forme simplifiée ``shape`` dans un graphe
+    allégé, ou le segment entre ses extrémités si elle est droite) tous les
+    ``sensor_radius / 2`` mètres au plus. Les échantillons sont regroupés en points de
+    passage par une couverture gloutonne sur un KD-tree, avec un rayon réduit de la moitié
+    de l'espacement (et de SLIM_SHAPE_TOLERANCE pour une forme simplifiée) pour que tout
+    point de la rue, et pas seulement les échantillons, reste dans le rayon d'observation. La
+    tournée des points de passage est construite au plus proche voisin et améliorée
+    par 2-opt sur listes de voisins.
+
+    :param graph: Le graphe du quartier.
+    :param sensor_radius: Le rayon d'observation du drone, en mètres.
+    :param cache: SolverCache optionnel ; le résultat est relu si le graphe n'a pas changé.
+    :return: La liste des points de passage (x, y) dans les coordonnées du graphe et la distance totale en km.
+    """
+    # Échantillonnage des tronçons (une seule fois par rue, quel que soit le sens)
+    streets = list({frozenset((u, v)): (u, v, data)
+                   for u, v, data in graph.edges(data=True) if u != v}.values())
+    if any('geometry' in data for _, _, data in streets):
+        geometry = 'geometry'
+    elif any('shape' in data for _, _, data in streets):
+        geometry = 'shape'
+    else:
+        geometry = None
+
+    key = None
+    if cache is not None:
+        # L'empreinte ne couvre pas les géométries : un graphe allégé a sa propre entrée
+        key = cache.key(graph_fingerprint(graph), 'drone_coverage',
+                        sensor_radius=sensor_radius, geometry=geometry)
+        result = cache.get(key)
+        if result is not None:
+            return result
+
+    if not streets:
+        return [], 0
+    spacing = sensor_radius / 2
+    cover_radius = sensor_radius - spacing / 2
+    if geometry == 'shape':
+        cover_radius -= SLIM_SHAPE_TOLERANCE
+    crs = graph.graph.get('crs', 'epsg:4326')
+    points_raw = []
+    for u, v, data in streets:
+        if 'geometry' in data:
+            line = np.array(data['geometry'].coords, dtype=float)
+        elif 'shape' in data:
+            line = np.array(shapely.wkt.loads(data['shape']).coords, dtype=float)
+        else:
+            line = np.array([(graph.nodes[node]['x'], graph.nodes[node]['y'])
+                             for node in (u, v)], dtype=float)
+        # Positions curvilignes des échantillons, au milieu de pas réguliers
+        projected = project_points(line, crs)
+        cumulative = np.concatenate(
+            ([0], np.cumsum(np.linalg.norm(np.diff(projected, axis=0), axis=1))))
+        count = max(1, math.ceil(cumulative[-1] / spacing))
+        positions = (np.arange(count) + 0.5) / count * cumulative[-1]
+        points_raw.append(np.column_stack((np.interp(positions, cumulative, line[:, 0]),
+                                           np.interp(positions, cumulative, line[:, 1]))))
+    points_raw = np.concatenate(points_raw)
+    points = project_points(points_raw, crs)
+
+    # Couverture gloutonne : chaque échantillon non couvert devient un point de passage
+    tree = cKDTree(points)
+    covered = np.zeros(len(points), dtype=bool)
+    waypoints = []
+    for i in range(len(points)):
+        if not covered[i]:
+            waypoints.append(i)
+            covered[tree.query_ball_point(points[i], cover_radius)] = True
+    waypoint_coords = points[waypoints]
+
+    tour = drone_tour(waypoint_coords)
+    xy = waypoint_coords[tour].tolist()
+    total_distance = sum(math.dist(xy[i], xy[(i + 1) % len(xy)])
+                         for i in range(len(xy))) / 1000
+    drone_path = [tuple(point)
+                  for point in points_raw[waypoints][tour].tolist()]
     drone_path.append(drone_path[0])  # Retourner au point de départ
+
+    if key is not None:
+        cache.put(key, (drone_path, total_distance))
     return drone_path, total_distance
 
 
+def drone_tour(coords, neighbours=DRONE_TSP_NEIGHBOURS, max_passes=DRONE_TSP_MAX_PASSES):
+    """
+    Construire une tournée courte passant par tous les points (TSP euclidien heuristique).
+
+    Plus proche voisin guidé par un KD-tree, puis 2-opt restreint aux ``neighbours``
+    plus proches voisins de chaque point. Seuls les points dont une arête voisine vient
+    de changer sont réexaminés (« don't-look bits »), et chaque mouvement inverse le plus
+    court des deux côtés de la tournée : le coût reste proche du linéaire en pratique.
+
+    :param coords: Le tableau numpy (n, 2) des points, en mètres.
+    :param max_passes: Nombre maximal de mouvements, en multiples de n.
+    :return: L'ordre de visite des points (liste d'indices).
+    """
+    n = len(coords)
+    if n <= 3:
+        return list(range(n))
+    tree = cKDTree(coords)
+    k = min(neighbours + 1, n)
+    neighbour_lists = tree.query(coords, k=k)[1][:, 1:].tolist()
+    xy = coords.tolist()
+
+    # Construction au plus proche voisin
+    visited = np.zeros(n, dtype=bool)
+    tour = [0]
+    visited[0] = True
+    for _ in range(n - 1):
+        current = tour[-1]
+        nearest = next((j for j in neighbour_lists[current] if not visited[j]), None)
+        width = 2 * k
+        while nearest is None:
+            # Voisins tous visités : on élargit la recherche dans le KD-tree
+            indices = tree.query(coords[current], k=min(width, n))[1]
+            nearest = next((int(j) for j in indices if not visited[j]), None)
+            width *= 2
+        tour.append(int(nearest))
+        visited[nearest] = True
+
+    tour = np.array(tour)
+    position = np.empty(n, dtype=int)
+    position[tour] = np.arange(n)
+
+    def reverse(i, j):
+        # Inverser les positions i..j (circulairement), ou le côté complémentaire s'il est plus court
+        length = (j - i) % n + 1
+        if 2 * length > n:
+            i, length = (j + 1) % n, n - length
+        indices = (i + np.arange(length)) % n
+        tour[indices] = tour[indices[::-1]]
+        position[tour[indices]] = indices
+
+    # Amélioration 2-opt : remplacer (a, b), (c, d) par (a, c), (b, d)
+    queue = deque(tour.tolist())
+    queued = [True] * n
+    moves = 0
+    while queue and moves < max_passes * n:
+        a = queue.popleft()
+        queued[a] = False
+        for step in (1, -1):
+            # step = 1 : b suit a et d suit c ; step = -1 : b précède a et d précède c
+            b = int(tour[(position[a] + step) % n])
+            d_ab = math.dist(xy[a], xy[b])
+            move = None
+            for c in neighbour_lists[a]:
+                d_ac = math.dist(xy[a], xy[c])
+                if d_ac >= d_ab:
+                    break
+                d = int(tour[(position[c] + step) % n])
+                if c == b or d == a:
+                    continue
+                if d_ac + math.dist(xy[b], xy[d]) < d_ab + math.dist(xy[c], xy[d]) - 1e-9:
+                    move = c, d
+                    break
+            if move is not None:
+                c, d = move
+                if step == 1:
+                    reverse(position[b], position[c])
+                else:
+                    reverse(position[a], position[d])
+                moves += 1
+                for node in (a, b, c, d):
+                    if not queued[node]:
+                        queued[node] = True
+                        queue.append(node)
+                break
+    return tour.tolist()
+
+
+def highway_priority(highway):
+    """
+    Priorité d'une rue d'après sa classe OSM.
+
+    :param highway: L'attribut 'highway' d'osmnx (chaîne ou liste si la rue fusionne plusieurs voies).
+    :return: La priorité (1 pour une rue résidentielle).
+    """
+    classes = highway if isinstance(highway, list) else [highway]
+    return max(HIGHWAY_PRIORITIES.get(str(highway_class).replace('_link', ''), 1)
+               for highway_class in classes)
+
+
+class PriorityScheduler:
+    """
+    Ordonnancer l'exécution des trajets selon la priorité des rues et l'intensité des chutes de neige.
+
+    Le circuit eulérien (en cache) est découpé en blocs contigus d'environ
+    SCHEDULER_BLOCK_LENGTH mètres. Les blocs sont triés par densité de priorité
+    (poids / durée, règle de Smith) et affectés un à un au véhicule qui les terminerait
+    le plus tôt, trajet à vide jusqu'au bloc compris. La distance à vol d'oiseau minore ce
+    trajet : seul le plus court chemin (mémorisé par GraphManager.connecting_path) des
+    véhicules qui peuvent encore l'emporter est calculé, ce qui permet de relancer
+    l'ordonnancement en continu pendant une tempête.
+    """
+
+    def __init__(self, manager, graph, num_vehicles, speed=VEHICLE_SPEED_TYPE_I):
+        """
+        Initialiser l'ordonnanceur.
+
+        :param manager: Le GraphManager fournissant le circuit eulérien.
+        :param graph: Le graphe du quartier.
+        :param num_vehicles: Le nombre de véhicules disponibles.
+        :param speed: La vitesse des véhicules en km/h.
+        """
+        self.manager = manager
+        self.graph = graph
+        self.fingerprint = graph_fingerprint(graph)
+        self.num_vehicles = num_vehicles
+        self.speed = speed
+        self.snowfall = {}
+        self.stream_offsets = {}
+        nodes, coords = projected_coordinates(graph)
+        self.coords = dict(zip(nodes, coords.tolist()))
+
+        # Découpage du circuit en blocs ; les arêtes ajoutées par l'eulérisation coupent les blocs
+        self.blocks = []
+        self.block_of_street = {}
+        current = []
+        current_length = 0
+        for u, v, _ in manager.get_eulerian_circuit(graph, self.fingerprint):
+            if not (graph.has_edge(u, v) or graph.has_edge(v, u)):
+                if current:
+                    self.blocks.append(current)
+                current, current_length = [], 0
+                continue
+            current.append((u, v))
+            self.block_of_street.setdefault(
+                frozenset((u, v)), len(self.blocks))
+            current_length += edge_length(graph, u, v)
+            if current_length >= SCHEDULER_BLOCK_LENGTH:
+                self.blocks.append(current)
+                current, current_length = [], 0
+        if current:
+            self.blocks.append(current)
+
+        self.block_lengths = [sum(edge_length(graph, u, v) for u, v in block)
+                              for block in self.blocks]
+        self.block_weights = [self.block_weight(index)
+                              for index in range(len(self.blocks))]
+
+    def street_weight(self, u, v):
+        """Poids d'une rue : priorité de sa classe multipliée par (1 + intensité des chutes de neige)."""
+        data = self.graph[u][v] if self.graph.has_edge(
+            u, v) else self.graph[v][u]
+        if self.graph.is_multigraph():
+            data = next(iter(data.values()))
+        return highway_priority(data.get('highway')) * (1 + self.snowfall.get(frozenset((u, v)), 0))
+
+    def block_weight(self, index):
+        """Poids total d'un bloc, chaque rue n'étant comptée qu'à son premier passage."""
+        return sum(self.street_weight(u, v) for u, v in self.blocks[index]
+                   if self.block_of_street[frozenset((u, v))] == index)
+
+    def set_snowfall(self, u, v, intensity):
+        """
+        Mettre à jour l'intensité des chutes de neige sur une rue (en cm/h).
+
+        Seul le poids du bloc contenant la rue est recalculé.
+
+        :return: True si la rue fait partie du circuit, False sinon (rien n'est modifié).
+        """
+        street = frozenset((u, v))
+        if street not in self.block_of_street:
+            return False
+        index = self.block_of_street[street]
+        old_weight = self.street_weight(u, v)
+        self.snowfall[street] = intensity
+        self.block_weights[index] += self.street_weight(u, v) - old_weight
+        return True
+
+    def update_from_stream(self, file_path):
+        """
+        Lire les nouvelles lignes d'un fichier de chutes de neige alimenté en continu.
+
+        Chaque ligne a la forme ``u;v;intensité``. Seules les lignes complètes ajoutées
+        depuis la lecture précédente sont traitées ; les lignes illisibles et les rues
+        absentes du circuit sont ignorées.
+
+        :param file_path: Le chemin du fichier.
+        :return: Le nombre de mises à jour appliquées.
+        """
+        updates = 0
+        with open(file_path, 'rb') as f:
+            f.seek(self.stream_offsets.get(file_path, 0))
+            for line in f:
+                if not line.endswith(b"\n"):
+                    # Ligne en cours d'écriture : on la relira au prochain appel
+                    break
+                self.stream_offsets[file_path] = f.tell()
+                try:
+                    u, v, intensity = line.decode().strip().split(';')
+                    updates += self.set_snowfall(int(u), int(v), float(intensity))
+                except ValueError:
+                    continue
+        return updates
+
+    def schedule(self):
+        """
+        Calculer l'ordre d'exécution des blocs pour chaque véhicule.
+
+        :return: Les arêtes de chaque véhicule dans l'ordre d'exécution (trajets à vide entre
+            les blocs compris) et la somme des temps de fin de chaque bloc pondérés par sa
+            priorité (en heures).
+        """
+        order = sorted(range(len(self.blocks)),
+                       key=lambda i: -self.block_weights[i] / max(self.block_lengths[i], 1))
+        routes = [[] for _ in range(self.num_vehicles)]
+        finish_times = [0] * self.num_vehicles
+        positions = [None] * self.num_vehicles
+        weighted_completion = 0
+        for index in order:
+            block = self.blocks[index]
+            start = block[0][0]
+            work = self.block_lengths[index] / 1000 / self.speed
+
+            # Minorant à vol d'oiseau : on calcule les vrais trajets par minorant croissant
+            bounds = []
+            for vehicle, position in enumerate(positions):
+                straight = 0 if position is None else math.dist(
+                    self.coords[position], self.coords[start])
+                bounds.append((finish_times[vehicle] + work +
+                               straight / 1000 / self.speed, vehicle))
+            bounds.sort()
+            best = None
+            for bound, vehicle in bounds:
+                if best is not None and bound >= best[0]:
+                    break
+                path, approach = [], 0
+                if positions[vehicle] is not None and positions[vehicle] != start:
+                    path, approach = self.manager.connecting_path(
+                        self.graph, positions[vehicle], start, self.fingerprint)
+                finish = finish_times[vehicle] + work + approach / 1000 / self.speed
+                if best is None or finish < best[0]:
+                    best = (finish, vehicle, path)
+            finish, vehicle, path = best
+            routes[vehicle].extend((u, v) for u, v, _ in path)
+            routes[vehicle].extend(block)
+            finish_times[vehicle] = finish
+            positions[vehicle] = block[-1][1]
+            weighted_completion += self.block_weights[index] * finish
+        return routes, weighted_completion
+
+
+def solve_district(manager, graph, num_vehicles, fleet=None):
+    """
+    Résoudre le trajet du drone et le postier chinois pour un quartier.
+
+    :param manager: Le GraphManager (et son cache) utilisé pour le postier chinois.
+    :param graph: Le graphe du quartier.
+    :param num_vehicles: Le nombre de véhicules disponibles.
+    :param fleet: Flotte mixte optionnelle, par exemple {'I': 2, 'II': 1} (voir GraphManager.solve_mixed_fleet).
+    :return: Le dictionnaire des trajets, distances et temps du quartier.
+    """
+    # Aucun solveur ne tire de nombres aléatoires : l'ordre canonique des noeuds suffit,
+    # sans toucher à l'état global de random / numpy de l'appelant
+    if manager.deterministic and not graph.graph.get('canonical'):
+        graph = canonical_graph(graph)
+    if drone_coverage:
+        drone_path, drone_distance = plan_drone_coverage(
+            graph, cache=manager.cache)
+    else:
+        drone_path, drone_distance = optimize_drone_path(graph, manager.cache)
+    circuits, postman_distance, max_time_type_I, max_time_type_II = manager.solve_chinese_postman(
+        graph, num_vehicles)
+    result = {"drone_path": drone_path,
+              "drone_distance": drone_distance,
+              "postman_path": circuits,
+              "postman_distance": postman_distance,
+              "time_type_I": max_time_type_I,
+              "time_type_II": max_time_type_II,
+              "route_hash": route_hash(drone_path, circuits)}
+    if fleet:
+        result["mixed_fleet"], result["mixed_fleet_cost"] = manager.solve_mixed_fleet(
+            graph, fleet)
+    return result
+
+
+def solve_districts_parallel(manager, graphs, num_vehicles, fleet=None):
+    """
+    Résoudre plusieurs quartiers en parallèle, un processus par quartier.
+
+    :param manager: Le GraphManager partagé (copié dans chaque processus).
+    :param graphs: Les graphes des quartiers.
+    :param num_vehicles: Le nombre de véhicules disponibles.
+    :param fleet: Flotte mixte optionnelle (voir solve_district).
+    :return: La liste des résultats de solve_district, dans l'ordre des graphes.
+    """
+    with ProcessPoolExecutor(max_workers=min(len(graphs), os.cpu_count() or 1)) as executor:
+        return list(executor.map(solve_district, [manager] * len(graphs), graphs,
+                                 [num_vehicles] * len(graphs), [fleet] * len(graphs)))
+
+
+def compute_costs(result, num_vehicles):
+    """
+    Appliquer le modèle de coût (Problème 3) aux distances et temps d'un quartier.
+
+    :param result: Le dictionnaire produit par solve_district.
+    :param num_vehicles: Le nombre de véhicules utilisés.
+    :return: Le dictionnaire des coûts du drone et des véhicules de type I et II.
+    """
+    drone_cost = 100 + 0.01 * result["drone_distance"]
+
+    # Calcul du coût horaire
+    cost_hour_type_I = hourly_cost(
+        result["time_type_I"], 'I') * num_vehicles
+    cost_hour_type_II = hourly_cost(
+        result["time_type_II"], 'II') * num_vehicles
+
+    # Coût des opérations de déneigement avec véhicules type I
+    vehicle_cost_type_I = VEHICLE_TYPES['I']['fixed_cost'] + VEHICLE_TYPES['I']['km_cost'] * \
+        result["postman_distance"] + cost_hour_type_I
+
+    # Coût des opérations de déneigement avec véhicules type II
+    vehicle_cost_type_II = VEHICLE_TYPES['II']['fixed_cost'] + VEHICLE_TYPES['II']['km_cost'] * \
+        result["postman_distance"] + cost_hour_type_II
+
+    return {"drone_cost": drone_cost,
+            "vehicle_cost_type_I": vehicle_cost_type_I,
+            "vehicle_cost_type_II": vehicle_cost_type_II,
+            "num_vehicles": num_vehicles}
+
+
+def hourly_cost(time, vehicle_type):
+    """
+    Coût horaire d'un véhicule, heures supplémentaires majorées au-delà de OVERTIME_THRESHOLD.
+
+    :param time: Le temps de travail du véhicule en heures.
+    :param vehicle_type: 'I' ou 'II'.
+    :return: Le coût horaire du véhicule.
+    """
+    rates = VEHICLE_TYPES[vehicle_type]
+    return (min(time, OVERTIME_THRESHOLD) * rates['hour_cost'] +
+            max(0, time - OVERTIME_THRESHOLD) * rates['overtime_hour_cost'])
+
+
 def main():
     city_name = 'Montreal, Quebec, Canada'
     file_path = 'montreal.graphml'
 
     # Charger le graphe de la ville
-    manager = GraphManager(city_name, file_path)
+    cache = SolverCache()
+    manager = GraphManager(city_name, file_path, slim=True,
+                           cache=cache, deterministic=deterministic)
 
     quartiers = ["Outremont, Montreal, Canada",
                  "Verdun, Montreal, Canada",
@@ -327,49 +1991,36 @@ def main():
     results = []
     cpt = 0
 
+    if merge_districts:
+        # Un seul graphe dédoublonné, puis les quartiers en parallèle
+        _, district_graphs = manager.merge_districts(
+            [manager.get_graph_district(i, quartiers) for i in range(len(quartiers))])
+        # Un quartier dont toutes les rues reviennent à ses voisins n'a plus rien à déneiger
+        quartiers, district_graphs = zip(*[(quartier, graph) for quartier, graph in zip(quartiers, district_graphs)
+                                           if graph.number_of_edges() > 0])
+        solutions = solve_districts_parallel(
+            manager, district_graphs, num_vehicles, mixed_fleet)
+
     for i, quartier in enumerate(quartiers):
         quartier_results = {"quartier": quartier}
 
-        # Charger le graphe du quartier
-        graph_quartier = manager.get_graph_district(i, quartiers)
-
-        with suppress_output():
-            # Optimiser le trajet du drone (Problème 1)
-            drone_path_quartier, distance_quartier = optimize_drone_path(
-                graph_quartier)
-            quartier_results["drone_path"] = drone_path_quartier
-            quartier_results["drone_distance"] = distance_quartier
-
-            # Identifier les zones nécessitant un déneigement
-            snow_removal_nodes_quartier = drone_path_quartier
-
-            # Résoudre le problème du postier chinois (Problème 2)
-            circuits, postman_distance_quartier, max_time_type_I, max_time_type_II = manager.solve_chinese_postman(
-                graph_quartier, num_vehicles)
-            quartier_results["postman_path"] = circuits
-            quartier_results["postman_distance"] = postman_distance_quartier
-            quartier_results["time_type_I"] = max_time_type_I
-            quartier_results["time_type_II"] = max_time_type_II
-
-            # Modèle de coût (Problème 3)
-            drone_cost = 100 + 0.01 * distance_quartier
-
-            # Calcul du coût horaire
-            cost_hour_type_I = (min(max_time_type_I, 8) * 1.1 +
-                                max(0, max_time_type_I - 8) * 1.3) * num_vehicles
-            cost_hour_type_II = (min(max_time_type_II, 8) * 1.3 +
-                                 max(0, max_time_type_II - 8) * 1.5) * num_vehicles
+        if merge_districts:
+            graph_quartier = district_graphs[i]
+            quartier_results.update(solutions[i])
+        else:
+            # Charger le graphe du quartier
+            graph_quartier = manager.get_graph_district(i, quartiers)
 
-            # Coût des opérations de déneigement avec véhicules type I
-            vehicle_cost_type_I = 500 + 1.1 * postman_distance_quartier + cost_hour_type_I
+            with suppress_output():
+                # Optimiser le trajet du drone (Problème 1) et résoudre le problème du postier chinois (Problème 2)
+                quartier_results.update(solve_district(
+                    manager, graph_quartier, num_vehicles, mixed_fleet))
 
-            # Coût des opérations de déneigement avec véhicules type II
-            vehicle_cost_type_II = 800 + 1.3 * postman_distance_quartier + cost_hour_type_II
+        drone_path_quartier = quartier_results["drone_path"]
+        circuits = quartier_results["postman_path"]
 
-            quartier_results["drone_cost"] = drone_cost
-            quartier_results["vehicle_cost_type_I"] = vehicle_cost_type_I
-            quartier_results["vehicle_cost_type_II"] = vehicle_cost_type_II
-            quartier_results["num_vehicles"] = num_vehicles
+        # Modèle de coût (Problème 3)
+        quartier_results.update(compute_costs(quartier_results, num_vehicles))
 
         results.append(quartier_results)
         result = quartier_results
@@ -391,10 +2042,29 @@ def main():
             Fore.GREEN + f"Temps de déneigement avec véhicules type II : {result['time_type_II']:.2f} heures" + Style.RESET_ALL)
         print(
             Fore.CYAN + f"Nombre de déneigeuses utilisées : {result['num_vehicles']}" + Style.RESET_ALL)
+        if "mixed_fleet_cost" in result:
+            print(
+                Fore.RED + f"Coût des opérations de déneigement avec la flotte mixte {mixed_fleet} : {result['mixed_fleet_cost']:.2f} €" + Style.RESET_ALL)
+        print(
+            Fore.CYAN + f"Empreinte des trajets : {result['route_hash']}" + Style.RESET_ALL)
 
+        base_file_name = f"{quartier.replace(', Montreal, Canada', '').replace(' ', '_')}_{num_vehicles}_vehicules"
         visualizer = GraphVisualizerPlotly(graph_quartier)
         visualizer.visualize_results(
-            drone_path_quartier, circuits, f"{quartier.replace(', Montreal, Canada', '').replace(' ', '_')}_{num_vehicles}_vehicules")
+            drone_path_quartier, circuits, base_file_name)
+        manager.export_routes(i, quartiers, circuits,
+                              f"{base_file_name}_deneigeuses.csv")
+
+        if priority_schedule:
+            scheduler = PriorityScheduler(
+                manager, graph_quartier, num_vehicles)
+            if os.path.exists(SNOWFALL_STREAM):
+                scheduler.update_from_stream(SNOWFALL_STREAM)
+            priority_routes, weighted_completion = scheduler.schedule()
+            print(
+                Fore.CYAN + f"Ordonnancement par priorité : temps de fin pondéré {weighted_completion:.2f} heures" + Style.RESET_ALL)
+            manager.export_routes(i, quartiers, priority_routes,
+                                  f"{base_file_name}_priorite.csv")
 
     # Afficher le résumé final
     print(Fore.CYAN + "\nRésumé des opérations de déneigement pour tous les quartiers :" + Style.RESET_ALL)
@@ -0,0 +1,266 @@
+import json
+import sys
+import traceback
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import networkx as nx
+from colorama import Fore, Style
+
+from main import (GraphManager, PriorityScheduler, SolverCache, canonical_graph, compute_costs, graph_fingerprint,
+                  optimize_drone_path, plan_drone_coverage, route_hash, drone_coverage, deterministic)
+
+
+SERVICE_HOST = "127.0.0.1"  # Le service n'écoute qu'en local
+SERVICE_PORT = 8080
+SERVICE_WORKERS = 4  # Nombre de calculs menés en parallèle
+SERVICE_MEMORY_ENTRIES = 256  # Entrées du cache des solveurs gardées en mémoire
+# Seuls ces quartiers peuvent être demandés : leur nom sert de chemin de fichier et de requête OSM
+SERVICE_QUARTIERS = ("Outremont, Montreal, Canada",
+                     "Verdun, Montreal, Canada",
+                     "Le Plateau-Mont-Royal, Montreal, Canada",
+                     "Rivière-des-Prairies-Pointe-aux-Trembles, Montreal, Canada",
+                     "Anjou, Montreal, Canada")
+
+
+class SnowRemovalService:
+    """Garder les graphes des quartiers, leurs eulérisations et leurs distances en mémoire entre les requêtes."""
+
+    def __init__(self, workers=SERVICE_WORKERS, quartiers=SERVICE_QUARTIERS):
+        """
+        Initialiser le service.
+
+        :param workers: Nombre de requêtes calculées en parallèle.
+        :param quartiers: Les quartiers que les clients peuvent demander.
+        """
+        self.manager = GraphManager('Montreal, Quebec, Canada', 'montreal.graphml', slim=True,
+                                    cache=SolverCache(
+                                        memory_entries=SERVICE_MEMORY_ENTRIES),
+                                    deterministic=deterministic)
+        self.graphs = {}
+        self.fingerprints = {}
+        self.drone_results = {}
+        # Un verrou par quartier : le chargement d'un quartier ne bloque pas les autres
+        self.load_locks = {quartier: threading.Lock() for quartier in quartiers}
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.in_flight = {}
+        self.in_flight_lock = threading.Lock()
+
+    def get_graph(self, quartier):
+        """
+        Retourner le graphe résident d'un quartier, en le chargeant au premier appel.
+
+        :param quartier: Le nom du quartier, par exemple "Verdun, Montreal, Canada".
+        :return: Le graphe et son empreinte.
+        :raises ValueError: Si le quartier ne fait pas partie des quartiers du service.
+        """
+        if quartier not in self.load_locks:
+            raise ValueError(f"Quartier inconnu : {quartier!r}")
+        # Graphe déjà résident : lecture sans verrou (le graphe n'est publié qu'une fois complet)
+        if quartier not in self.graphs:
+            # Deux requêtes sur le même quartier ne le téléchargent pas deux fois
+            with self.load_locks[quartier]:
+                if quartier not in self.graphs:
+                    graph = self.manager.get_graph_district(0, [quartier])
+                    if self.manager.deterministic:
+                        graph = canonical_graph(graph)
+                    self.fingerprints[quartier] = graph_fingerprint(graph)
+                    self.graphs[quartier] = graph
+        return self.graphs[quartier], self.fingerprints[quartier]
+
+    def get_drone_result(self, quartier):
+        """Trajet et distance du drone d'un quartier (indépendants de la taille de la flotte)."""
+        if quartier not in self.drone_results:
+            graph, _ = self.get_graph(quartier)
+            if drone_coverage:
+                self.drone_results[quartier] = plan_drone_coverage(
+                    graph, cache=self.manager.cache)
+            else:
+                self.drone_results[quartier] = optimize_drone_path(
+                    graph, self.manager.cache)
+        return self.drone_results[quartier]
+
+    def solve(self, params):
+        """
+        Résoudre un quartier pour une taille de flotte donnée.
+
+        :param params: {"quartier": ..., "num_vehicles": ..., "include_paths": false}
+        :return: Les distances, temps et coûts (et les trajets si demandés).
+        """
+        quartier = params["quartier"]
+        num_vehicles = int(params["num_vehicles"])
+        if num_vehicles < 1:
+            raise ValueError("num_vehicles doit être au moins 1")
+        graph, fingerprint = self.get_graph(quartier)
+        drone_path, drone_distance = self.get_drone_result(quartier)
+        circuits, postman_distance, max_time_type_I, max_time_type_II = self.manager.solve_chinese_postman(
+            graph, num_vehicles, fingerprint)
+        result = {"quartier": quartier,
+                  "drone_distance": drone_distance,
+                  "postman_distance": postman_distance,
+                  "time_type_I": max_time_type_I,
+                  "time_type_II": max_time_type_II,
+                  "route_hash": route_hash(drone_path, circuits)}
+        result.update(compute_costs(result, num_vehicles))
+        if params.get("include_paths"):
+            result["drone_path"] = drone_path
+            result["postman_path"] = circuits
+        return result
+
+    def sweep(self, params):
+        """
+        Évaluer une plage de tailles de flotte pour un quartier.
+
+        :param params: {"quartier": ..., "min_vehicles": 1, "max_vehicles": 10}
+        :return: La liste des résultats de solve, un par taille de flotte.
+        """
+        min_vehicles = int(params.get("min_vehicles", 1))
+        max_vehicles = int(params.get("max_vehicles", 10))
+        return [self.solve({"quartier": params["quartier"], "num_vehicles": n})
+                for n in range(min_vehicles, max_vehicles + 1)]
+
+    def replan(self, params):
+        """
+        Redistribuer les rues restantes après une panne (voir GraphManager.replan_routes).
+
+        Une position peut être un noeud du graphe ou un point GPS [longitude, latitude],
+        rattaché au noeud le plus proche par l'index spatial du quartier.
+
+        :param params: {"quartier": ..., "vehicle_positions": {"1": noeud ou [lon, lat], ...}, "completed_edges": [[u, v], ...]}
+        :return: Les trajets et distances de chaque véhicule encore en service.
+        """
+        graph, fingerprint = self.get_graph(params["quartier"])
+        positions = dict(params["vehicle_positions"])
+        gps_positions = {vehicle: position for vehicle, position in positions.items()
+                         if isinstance(position, list)}
+        if gps_positions:
+            nodes = self.manager.get_spatial_index(
+                graph, fingerprint).nearest_nodes(list(gps_positions.values()))
+            positions.update(zip(gps_positions, nodes.tolist()))
+        routes, distances = self.manager.replan_routes(
+            graph, positions,
+            [tuple(edge) for edge in params.get("completed_edges", [])], fingerprint)
+        return {"routes": routes, "distances": distances}
+
+    def schedule(self, params):
+        """
+        Ordonnancer les trajets par priorité des rues et intensité des chutes de neige (voir PriorityScheduler).
+
+        :param params: {"quartier": ..., "num_vehicles": ..., "snowfall": [[u, v, intensité], ...]}
+        :return: Les trajets de chaque véhicule, le temps de fin pondéré et le nombre de chutes de neige appliquées.
+        """
+        num_vehicles = int(params["num_vehicles"])
+        if num_vehicles < 1:
+            raise ValueError("num_vehicles doit être au moins 1")
+        graph, _ = self.get_graph(params["quartier"])
+        scheduler = PriorityScheduler(self.manager, graph, num_vehicles)
+        applied = sum(scheduler.set_snowfall(u, v, float(intensity))
+                      for u, v, intensity in params.get("snowfall", []))
+        routes, weighted_completion = scheduler.schedule()
+        return {"routes": routes, "weighted_completion": weighted_completion, "snowfall_applied": applied}
+
+    def enqueue(self, endpoint, params):
+        """
+        Placer une requête sur le pool de calcul.
+
+        Les requêtes identiques reçues pendant qu'un calcul est en cours sont regroupées
+        et partagent son résultat.
+
+        :param endpoint: 'solve', 'sweep', 'replan' ou 'schedule'.
+        :param params: Les paramètres JSON de la requête.
+        :return: Le Future du calcul.
+        """
+        handler = {"solve": self.solve, "sweep": self.sweep,
+                   "replan": self.replan, "schedule": self.schedule}[endpoint]
+        key = (endpoint, json.dumps(params, sort_keys=True))
+        with self.in_flight_lock:
+            future = self.in_flight.get(key)
+            if future is not None:
+                return future
+            future = self.executor.submit(handler, params)
+            self.in_flight[key] = future
+        # Hors du verrou : le rappel s'exécute tout de suite si le calcul est déjà fini
+        future.add_done_callback(lambda _: self.forget(key))
+        return future
+
+    def forget(self, key):
+        """Retirer une requête terminée de la table des calculs en cours."""
+        with self.in_flight_lock:
+            self.in_flight.pop(key, None)
+
+    def batch(self, params):
+        """
+        Exécuter plusieurs requêtes en parallèle sur le pool de calcul.
+
+        :param params: {"requests": [{"endpoint": "solve", ...}, ...]}
+        :return: La liste des résultats, dans l'ordre des requêtes.
+        """
+        futures = [self.enqueue(request["endpoint"],
+                                {key: value for key, value in request.items() if key != "endpoint"})
+                   for request in params["requests"]]
+        return [future.result() for future in futures]
+
+
+class RequestHandler(BaseHTTPRequestHandler):
+    """Point d'entrée HTTP/JSON : POST /solve, /sweep, /replan, /schedule, /batch et GET /health."""
+
+    service = None
+
+    def send_json(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/health":
+            self.send_json(200, {"quartiers": sorted(self.service.graphs)})
+        else:
+            self.send_json(404, {"erreur": "Route inconnue"})
+
+    def do_POST(self):
+        endpoint = self.path.strip("/")
+        if endpoint not in ("solve", "sweep", "replan", "schedule", "batch"):
+            self.send_json(404, {"erreur": "Route inconnue"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            params = json.loads(self.rfile.read(length) or b"{}")
+            if endpoint == "batch":
+                result = self.service.batch(params)
+            else:
+                result = self.service.enqueue(endpoint, params).result()
+        except (KeyError, ValueError, TypeError, nx.NodeNotFound) as error:
+            self.send_json(400, {"erreur": str(error)})
+            return
+        except Exception as error:
+            # Téléchargement impossible, cache illisible... : le client reçoit toujours une réponse
+            traceback.print_exc()
+            self.send_json(500, {"erreur": str(error)})
+            return
+        self.send_json(200, result)
+
+    def log_message(self, format, *args):
+        print(Fore.CYAN + "[service] " + format % args + Style.RESET_ALL)
+
+
+def main():
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else SERVICE_PORT
+    RequestHandler.service = SnowRemovalService()
+    server = ThreadingHTTPServer((SERVICE_HOST, port), RequestHandler)
+    print(Fore.GREEN +
+          f"Service de déneigement à l'écoute sur http://{SERVICE_HOST}:{port}" + Style.RESET_ALL)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        RequestHandler.service.executor.shutdown()
+
+
+if __name__ == "__main__":
+    main()
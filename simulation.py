@@ -0,0 +1,98 @@
+import sys
+import time
+from colorama import Fore, Style
+
+from main import GraphManager, SolverCache, canonical_graph, deterministic
+
+
+EDGES_PER_TICK = 5  # Arêtes parcourues par chaque véhicule entre deux événements
+BREAKDOWN_TICKS = (3, 8)  # Instants des pannes simulées (un véhicule tombe en panne à chaque instant)
+
+
+def route_breaks(route):
+    """
+    Compter les ruptures d'un trajet : arêtes consécutives qui ne se suivent pas.
+
+    :param route: Les arêtes (u, v) du trajet.
+    :return: Le nombre d'indices i tels que l'arête i ne finit pas là où commence l'arête i + 1.
+    """
+    return sum(1 for (_, v), (u, _) in zip(route, route[1:]) if v != u)
+
+
+def simulate_event_stream(manager, graph, num_vehicles, breakdown_ticks=BREAKDOWN_TICKS,
+                          edges_per_tick=EDGES_PER_TICK):
+    """
+    Rejouer une opération de déneigement avec des pannes, en replanifiant à chaque panne.
+
+    À chaque instant, chaque véhicule avance de ``edges_per_tick`` arêtes sur son trajet ;
+    aux instants de ``breakdown_ticks``, le premier véhicule encore en service tombe en
+    panne et les rues restantes sont redistribuées par GraphManager.replan_routes.
+
+    :param manager: Le GraphManager du quartier.
+    :param graph: Le graphe du quartier.
+    :param num_vehicles: Le nombre de véhicules au départ.
+    :param breakdown_ticks: Les instants des pannes.
+    :param edges_per_tick: Le nombre d'arêtes parcourues par instant.
+    :return: La liste des événements (instant, véhicule en panne, durée de la replanification,
+        ruptures dans les nouveaux trajets) et l'ensemble des rues déneigées.
+    """
+    circuits, _, _, _ = manager.solve_chinese_postman(graph, num_vehicles)
+    routes = {vehicle: list(circuit) for vehicle, circuit in enumerate(circuits)}
+    positions = {vehicle: route[0][0] for vehicle, route in routes.items() if route}
+    streets = {frozenset((u, v)) for u, v in graph.edges() if u != v}
+    completed = set()
+    events = []
+    tick = 0
+
+    while routes and any(routes.values()):
+        tick += 1
+        for vehicle, route in routes.items():
+            for u, v in route[:edges_per_tick]:
+                if frozenset((u, v)) in streets:
+                    completed.add(frozenset((u, v)))
+                positions[vehicle] = v
+            del route[:edges_per_tick]
+
+        if tick in breakdown_ticks and len(routes) > 1:
+            broken = min(routes)
+            del routes[broken], positions[broken]
+            start = time.perf_counter()
+            new_routes, _ = manager.replan_routes(
+                graph, positions, [tuple(street) for street in completed])
+            duration = time.perf_counter() - start
+            routes = {vehicle: list(route)
+                      for vehicle, route in new_routes.items()}
+            events.append((tick, broken, duration,
+                           sum(route_breaks(route) for route in routes.values())))
+
+    return events, completed
+
+
+def main():
+    quartier = sys.argv[1] if len(sys.argv) > 1 else "Verdun, Montreal, Canada"
+    num_vehicles = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+
+    manager = GraphManager('Montreal, Quebec, Canada', 'montreal.graphml', slim=True,
+                           cache=SolverCache(), deterministic=deterministic)
+    graph = manager.get_graph_district(0, [quartier])
+    if deterministic:
+        graph = canonical_graph(graph)
+
+    events, completed = simulate_event_stream(manager, graph, num_vehicles)
+    streets = {frozenset((u, v)) for u, v in graph.edges() if u != v}
+
+    for tick, broken, duration, breaks in events:
+        print(Fore.YELLOW +
+              f"Instant {tick} : panne du véhicule {broken}, replanification en {duration * 1000:.1f} ms, "
+              f"{breaks} rupture(s) dans les nouveaux trajets" + Style.RESET_ALL)
+    missing = len(streets - completed)
+    if missing or any(breaks for _, _, _, breaks in events):
+        print(Fore.RED +
+              f"Échec : {missing} rue(s) non déneigée(s)" + Style.RESET_ALL)
+        sys.exit(1)
+    print(Fore.GREEN +
+          f"Toutes les rues de {quartier} ont été déneigées malgré {len(events)} panne(s)" + Style.RESET_ALL)
+
+
+if __name__ == "__main__":
+    main()